@@ -0,0 +1,193 @@
+"""Vectorized vehicle arrivals for TrafficSystem (needs NumPy).
+
+TrafficSystem.vehicle_adder normally draws one random number per lane per
+cycle. An ArrivalGenerator instead draws a whole block of cycles for every
+lane in one call - Bernoulli (at most one vehicle per lane per cycle, as
+vehicle_adder does) or Poisson - picks all their destinations from a
+precomputed table, and hands the arrivals out one cycle at a time.
+
+Rates can vary over time with a RateSchedule read from a CSV file. Each row
+gives the rates from its cycle onward; lanes missing from the header (or
+left blank) keep the base rate, and a rate of 0 closes a lane:
+
+    cycle,AL2,BL2,CL3
+    0,0.7,0.3,0.3
+    600,0.95,0.6,        # rush hour
+    900,0.7,0.3,0        # CL3 blocked by an incident
+    1100,0.7,0.3,0.3
+
+With a `period`, the schedule repeats (e.g. a day of 1440 one-minute cycles).
+
+    system = TrafficSystem(seed=7, headless=True)
+    system.arrivals = ArrivalGenerator.for_system(system, schedule=RateSchedule.load("day.csv", period=1440))
+
+A seeded generator is reproducible for the same block size, but it does not
+reproduce the per-lane random.random() draws of the default arrivals.
+"""
+import csv
+import random
+
+import numpy as np
+
+from traffic_generator import DESTINATIONS
+
+BLOCK_CYCLES = 4096
+MODELS = ("bernoulli", "poisson")
+
+
+class RateSchedule:
+    """Piecewise-constant arrival rates per lane, indexed by cycle"""
+    def __init__(self, points, period=None):
+        # points: [(start_cycle, {lane: rate})], sorted by start cycle
+        self.points = sorted(points, key=lambda point: point[0])
+        self.period = period
+
+    @classmethod
+    def load(cls, path, period=None):
+        points = []
+        with open(path, newline="") as f:
+            rows = csv.reader(line for line in f if line.strip() and not line.lstrip().startswith("#"))
+            header = [name.strip() for name in next(rows)]
+            if not header or header[0] != "cycle":
+                raise ValueError(f"{path}: first column must be 'cycle'")
+            for row in rows:
+                rates = {}
+                for lane, value in zip(header[1:], row[1:]):
+                    value = value.split("#", 1)[0].strip()
+                    if value:
+                        rates[lane] = float(value)
+                points.append((int(row[0]), rates))
+        return cls(points, period)
+
+    def rates(self, start, count, lanes, base):
+        """(count, len(lanes)) array of rates for cycles start .. start + count - 1"""
+        # Row 0 is the base rates, used before the first point
+        table = np.tile(np.asarray(base, dtype=np.float64), (len(self.points) + 1, 1))
+        for i, (_, rates) in enumerate(self.points, 1):
+            for j, lane in enumerate(lanes):
+                if lane in rates:
+                    table[i, j] = rates[lane]
+        cycles = np.arange(start, start + count)
+        if self.period:
+            cycles %= self.period
+        starts = np.array([cycle for cycle, _ in self.points], dtype=np.int64)
+        return table[np.searchsorted(starts, cycles, side="right")]
+
+    def __repr__(self):
+        return f"RateSchedule({len(self.points)} points, period={self.period})"
+
+
+class ArrivalGenerator:
+    """Draws arrivals for `lanes` in blocks of cycles and replays them per cycle"""
+    def __init__(self, lanes, rates, seed=None, schedule=None, model="bernoulli",
+                 block=BLOCK_CYCLES, destinations=DESTINATIONS):
+        if model not in MODELS:
+            raise ValueError(f"model must be one of {MODELS}")
+        self.lanes = list(lanes)
+        self.base_rates = np.asarray(rates, dtype=np.float64)
+        self.schedule = schedule
+        self.model = model
+        self.block = block
+        self.rng = np.random.default_rng(seed)
+
+        # Flat destination table: lane j picks uniformly among
+        # names[offset[j]:offset[j] + count[j]] (slot 0 is None for lanes without any)
+        names = [None]
+        self._offset = np.zeros(len(self.lanes), dtype=np.int64)
+        self._choices = np.ones(len(self.lanes), dtype=np.int64)
+        for j, lane in enumerate(self.lanes):
+            choices = destinations.get(lane)
+            if choices:
+                self._offset[j] = len(names)
+                self._choices[j] = len(choices)
+                names.extend(choices)
+        self._names = np.array(names, dtype=object)
+        self._lane_names = np.array(self.lanes, dtype=object)
+
+        self.start = None       # First cycle of the buffered block
+        self._bounds = None     # Arrivals of cycle start + k are _pairs[_bounds[k]:_bounds[k + 1]]
+        self._pairs = None
+        self.generated = 0
+
+    @classmethod
+    def for_system(cls, system, **kwargs):
+        """Generator for a TrafficSystem's arrival lanes, rates and seed"""
+        rates = [system.priority_arrival_rate if lane == "AL2" else system.arrival_rate
+                 for lane in system.arrival_lanes]
+        seed = kwargs.pop("seed", system.seed)
+        if seed is not None and not isinstance(seed, int):
+            # NumPy only takes integer seeds; TrafficSystem also allows strings
+            seed = random.Random(seed).getrandbits(64)
+        return cls(system.arrival_lanes, rates, seed=seed, **kwargs)
+
+    def generate(self, start, count):
+        """Draw arrivals for `count` cycles from `start`: (cycle offsets, lane indices, destinations)"""
+        if self.schedule is not None:
+            rates = self.schedule.rates(start, count, self.lanes, self.base_rates)
+        else:
+            rates = np.broadcast_to(self.base_rates, (count, len(self.lanes)))
+        if self.model == "poisson":
+            counts = self.rng.poisson(rates)
+        else:
+            counts = self.rng.random(rates.shape) < rates
+        # Row-major nonzero: ordered by cycle, then lane, like vehicle_adder
+        cycles, lanes = np.nonzero(counts)
+        if self.model == "poisson":
+            repeats = counts[cycles, lanes]
+            cycles = np.repeat(cycles, repeats)
+            lanes = np.repeat(lanes, repeats)
+        picks = (self.rng.random(cycles.size) * self._choices[lanes]).astype(np.int64)
+        return cycles, lanes, self._names[self._offset[lanes] + picks]
+
+    def _fill(self, start):
+        cycles, lanes, destinations = self.generate(start, self.block)
+        self.start = start
+        self._bounds = np.searchsorted(cycles, np.arange(self.block + 1)).tolist()
+        self._pairs = list(zip(self._lane_names[lanes].tolist(), destinations.tolist()))
+        self.generated += len(self._pairs)
+
+    def arrivals(self, cycle):
+        """[(lane, destination)] arriving in `cycle`; cycles are expected in order"""
+        k = cycle - self.start if self.start is not None else -1
+        if not 0 <= k < self.block:
+            self._fill(cycle)
+            k = 0
+        return self._pairs[self._bounds[k]:self._bounds[k + 1]]
+
+    def state(self):
+        """Settings, RNG state and buffered block, for checkpoint.py (JSON-serializable)"""
+        schedule = None
+        if self.schedule is not None:
+            schedule = {'points': self.schedule.points, 'period': self.schedule.period}
+        return {
+            'lanes': self.lanes,
+            'rates': self.base_rates.tolist(),
+            'model': self.model,
+            'block': self.block,
+            'schedule': schedule,
+            'rng': self.rng.bit_generator.state,
+            'start': self.start,
+            'bounds': self._bounds,     # Replaced, never mutated, on refill
+            'pairs': self._pairs,
+            'generated': self.generated,
+        }
+
+    def set_state(self, state):
+        if state['lanes'] != self.lanes:
+            raise ValueError("arrival lanes differ from the saved state")
+        self.base_rates = np.asarray(state['rates'], dtype=np.float64)
+        self.model = state['model']
+        self.block = state['block']
+        schedule = state['schedule']
+        self.schedule = None
+        if schedule is not None:
+            self.schedule = RateSchedule([(cycle, rates) for cycle, rates in schedule['points']],
+                                         schedule['period'])
+        self.rng.bit_generator.state = state['rng']
+        self.start = state['start']
+        self._bounds = state['bounds']
+        self._pairs = None if state['pairs'] is None else [tuple(pair) for pair in state['pairs']]
+        self.generated = state['generated']
+
+    def __repr__(self):
+        return f"ArrivalGenerator({self.model}, block={self.block}, schedule={self.schedule!r})"
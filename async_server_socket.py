@@ -0,0 +1,181 @@
+import asyncio
+import collections
+import socket
+import threading
+import time
+
+from latency_histogram import LatencyHistogram
+from subscriptions import Subscription, SubscriptionRegistry
+from wire_protocol import HEADER_SIZE, decode_payload, parse_header
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+
+class ClientConnection:
+    """One subscriber: its stream writer plus a bounded queue of (frame, queued_ns) to send"""
+    def __init__(self, reader, writer, max_pending):
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info("peername")
+        self.pending = collections.deque()
+        self.max_pending = max_pending
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+        # Queued to written and drained, in ns
+        self.send_latency = LatencyHistogram()
+
+
+class AsyncSocketServer:
+    """SocketServer with the same start/broadcast_data/stop surface, run on asyncio.
+
+    The event loop lives on a background thread. broadcast_data encodes one
+    frame per subscription (subscriptions.py) on the caller's thread and
+    hands them to the loop with
+    call_soon_threadsafe, so the simulation never waits on a socket. Each
+    client has its own writer task and a queue of at most `max_pending`
+    frames; when a client falls behind, `overflow` decides whether its oldest
+    frame is dropped (it then resyncs from a keyframe through the usual
+    sequence-gap path) or the client is disconnected.
+    """
+    def __init__(self, max_pending=64, overflow=DROP_OLDEST, backlog=1024):
+        if overflow not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self.PORT = 5050
+        self.SERVER = socket.gethostbyname(socket.gethostname())
+        self.ADDR = (self.SERVER, self.PORT)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(self.ADDR)
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.backlog = backlog
+        self.connected_clients = []
+        self.running = False
+        self.subscriptions = SubscriptionRegistry()
+        # Counters for metrics.py; broadcast counts are written by the
+        # broadcasting thread, sent bytes by the event loop
+        self.broadcasts = 0
+        self.broadcast_bytes = 0
+        self.sent_bytes = 0
+        self.loop = None
+        self._thread = None
+        self._async_server = None
+
+    def start(self):
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self.loop)
+            # Passing the bound socket avoids asyncio's executor-based address lookup
+            self._async_server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_client, sock=self.server, backlog=self.backlog))
+            print(f"[LISTENING] Async server on {self.SERVER}:{self.PORT}")
+            started.set()
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def broadcast_data(self, data):
+        if not self.running:
+            return
+        # One frame per subscription that is due, shared by its clients
+        frames = self.subscriptions.frames(data)
+        if not frames:
+            return
+        self.broadcasts += 1
+        self.broadcast_bytes += sum(len(frame) for frame, _ in frames)
+        self.loop.call_soon_threadsafe(self._fan_out, frames, time.perf_counter_ns())
+
+    def send_latencies(self):
+        """[(client address, LatencyHistogram)] for the connected clients"""
+        return [(f"{c.addr[0]}:{c.addr[1]}", c.send_latency) for c in self.connected_clients[:]]
+
+    def _fan_out(self, frames, queued_ns):
+        for frame, clients in frames:
+            for client in clients:
+                if client.closed:
+                    continue
+                if len(client.pending) >= client.max_pending:
+                    if self.overflow == DISCONNECT:
+                        self._close_client(client)
+                        continue
+                    client.pending.popleft()
+                    client.dropped += 1
+                client.pending.append((frame, queued_ns))
+                client.ready.set()
+
+    async def _write_frames(self, client):
+        while not client.closed:
+            await client.ready.wait()
+            client.ready.clear()
+            while client.pending and not client.closed:
+                frame, queued_ns = client.pending.popleft()
+                client.writer.write(frame)
+                await client.writer.drain()
+                client.send_latency.record(time.perf_counter_ns() - queued_ns)
+                self.sent_bytes += len(frame)
+
+    async def _read_requests(self, client):
+        while not client.closed:
+            codec, length = parse_header(await client.reader.readexactly(HEADER_SIZE))
+            request = decode_payload(codec, await client.reader.readexactly(length))
+            kind = request.get('type')
+            if kind == 'resync':
+                self.subscriptions.request_keyframe(client)
+            elif kind == 'subscribe':
+                try:
+                    self.subscriptions.join(client, Subscription.from_message(request))
+                except ValueError as e:
+                    print(f"[SUBSCRIBE] {client.addr} ignored: {e}")
+
+    async def _handle_client(self, reader, writer):
+        client = ClientConnection(reader, writer, self.max_pending)
+        self.connected_clients.append(client)
+        self.subscriptions.join(client)
+        tasks = [asyncio.ensure_future(self._write_frames(client)),
+                 asyncio.ensure_future(self._read_requests(client))]
+        try:
+            # Either task ending means the connection is done
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    error = task.exception()
+                    if not isinstance(error, (ConnectionError, asyncio.IncompleteReadError)):
+                        print(f"[ERROR] {client.addr}: {error!r}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._close_client(client)
+
+    def _close_client(self, client):
+        if client in self.connected_clients:
+            self.connected_clients.remove(client)
+        self.subscriptions.leave(client)
+        if not client.closed:
+            client.closed = True
+            client.ready.set()
+            client.writer.close()
+
+    def stop(self):
+        self.running = False
+        if self.loop is None:
+            self.server.close()
+            print("[SERVER] Stopped")
+            return
+
+        def shutdown():
+            for client in self.connected_clients[:]:
+                self._close_client(client)
+            self._async_server.close()
+            self.loop.stop()
+
+        self.loop.call_soon_threadsafe(shutdown)
+        self._thread.join(timeout=5)
+        self.server.close()
+        print("[SERVER] Stopped")
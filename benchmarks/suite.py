@@ -0,0 +1,323 @@
+"""Benchmark suite for queues, simulation cycles, serialization and rendering.
+
+Every benchmark runs `--repeat` times on seeded input and keeps the fastest
+run, reported as microseconds per operation. Results can be saved as JSON
+and compared against a saved baseline; a benchmark more than `--threshold`
+percent slower than the baseline counts as a regression and makes the
+command exit with status 1.
+
+Run from the repository root:
+    python benchmarks/suite.py --out baseline.json
+    python benchmarks/suite.py --compare baseline.json            # run, then compare
+    python benchmarks/suite.py --compare baseline.json new.json   # compare two saved files
+    python benchmarks/suite.py --only queue --quick
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from delta_protocol import DeltaEncoder
+from queue import LaneNode, LanePriorityQueue, VehicleQueue
+from traffic_generator import TrafficSystem, Vehicle
+from wire_protocol import encode_frame
+
+QUEUE_DEPTHS = (16, 1000, 100000)
+
+
+def best_of(repeat, setup, run, ops):
+    """Fastest of `repeat` runs of run(setup()), in seconds per operation"""
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / ops
+
+
+def broadcast_messages(cycles):
+    """Keyframes and deltas as a live server would send them, from seed 1"""
+    system = TrafficSystem(seed=1, headless=True)
+    encoder = DeltaEncoder()
+    messages = []
+    for _ in range(cycles):
+        system.step()
+        messages.append(encoder.encode(system.snapshot()))
+    return messages
+
+
+def bench_queue(repeat, scale):
+    vehicle = Vehicle("V0001", "AL2")
+    results = {}
+    for depth in QUEUE_DEPTHS:
+        n = max(depth, int(200000 * scale))
+        rounds = max(1, n // depth)
+
+        def fill(depth=depth):
+            q = VehicleQueue("AL2")
+            for _ in range(depth):
+                q.enqueue(vehicle)
+            return q
+
+        def churn(q, rounds=rounds, depth=depth):
+            # Keep the queue at `depth`: every enqueue is matched by a dequeue
+            for _ in range(rounds * depth):
+                q.enqueue(vehicle)
+                q.dequeue()
+
+        def get_all(q, rounds=rounds):
+            for _ in range(rounds):
+                q.get_all_vehicles()
+
+        results[f"queue.enqueue_dequeue[{depth}]"] = best_of(repeat, fill, churn, rounds * depth)
+        results[f"queue.get_all_vehicles[{depth}]"] = best_of(repeat, fill, get_all, rounds)
+    return results
+
+
+def bench_priority(repeat, scale):
+    updates = int(200000 * scale)
+    lanes = ["AL2", "BL2", "CL2", "DL2"]
+
+    def setup():
+        pq = LanePriorityQueue()
+        for lane in lanes:
+            pq.enqueue(LaneNode(lane, priority=0))
+        return pq
+
+    def churn(pq):
+        # Every lane cycles through priorities 0-10 so the heap keeps
+        # reordering; get_all_lanes() as select_next_green_road calls it
+        for i in range(updates):
+            pq.update_priority(lanes[i & 3], (i * 7) % 11)
+            pq.get_all_lanes()
+
+    return {"priority_queue.update_priority": best_of(repeat, setup, churn, updates)}
+
+
+def bench_cycles(repeat, scale):
+    cycles = int(50000 * scale)
+
+    def run(system):
+        for _ in range(cycles):
+            system.step()
+
+    def batched():
+        from arrivals import ArrivalGenerator
+        system = TrafficSystem(seed=1, headless=True)
+        system.arrivals = ArrivalGenerator.for_system(system)
+        return system
+
+    return {
+        "traffic_system.cycle": best_of(repeat, lambda: TrafficSystem(seed=1, headless=True), run, cycles),
+        "traffic_system.cycle_batched": best_of(repeat, batched, run, cycles),
+    }
+
+
+def bench_arrivals(repeat, scale):
+    from arrivals import ArrivalGenerator
+    cycles = int(100000 * scale)
+
+    def per_lane():
+        system = TrafficSystem(seed=1, headless=True)
+        system.check_priority_condition = lambda: None
+        return system
+
+    def batched():
+        system = per_lane()
+        system.arrivals = ArrivalGenerator.for_system(system)
+        return system
+
+    def run(system):
+        for cycle in range(cycles):
+            system.cycle = cycle
+            system.vehicle_adder()
+
+    return {
+        "arrivals.per_lane": best_of(repeat, per_lane, run, cycles),
+        "arrivals.batched": best_of(repeat, batched, run, cycles),
+    }
+
+
+class NullConnection:
+    """Accepts frames and discards them, so only encoding is measured"""
+    def sendall(self, data):
+        pass
+
+
+def bench_encode(repeat, scale):
+    from server_socket import SocketServer
+
+    messages = broadcast_messages(int(5000 * scale))
+    # Skip __init__ so no port is bound; send_to_client only needs send_frame
+    server = SocketServer.__new__(SocketServer)
+    conn = NullConnection()
+
+    def run(_):
+        for message in messages:
+            server.send_to_client(conn, message)
+
+    return {"socket_server.send_to_client": best_of(repeat, lambda: None, run, len(messages))}
+
+
+def bench_decode(repeat, scale):
+    from client_socket import SocketClient
+
+    frames = b"".join(encode_frame(m) for m in broadcast_messages(int(5000 * scale)))
+    count = int(5000 * scale)
+
+    def setup():
+        client = SocketClient()
+        client.client.close()
+        client.client, server_end = socket.socketpair()
+        client.running = True
+        received = []
+        client.data_callback = received.append
+
+        def feed():
+            server_end.sendall(frames)
+            server_end.close()
+
+        threading.Thread(target=feed, daemon=True).start()
+        return client, received
+
+    def run(state):
+        client, received = state
+        client.receive_data()
+        client.client.close()
+        if len(received) != count:
+            raise RuntimeError(f"decoded {len(received)} of {count} frames")
+
+    return {"socket_client.receive_data": best_of(repeat, setup, run, count)}
+
+
+def bench_render(repeat, scale):
+    # Offscreen surface: no window, display driver or frame cap
+    import simulator
+
+    messages = broadcast_messages(200)
+    frames = int(2000 * scale)
+
+    def setup():
+        sim = simulator.TrafficSimulator(headless=True)
+        sim.socket_client.client.close()
+        for message in messages:
+            sim.update_from_data(message)
+        return sim
+
+    def run(sim):
+        for _ in range(frames):
+            sim.update()
+            sim.draw()
+
+    return {"simulator.update_draw": best_of(repeat, setup, run, frames)}
+
+
+BENCHMARKS = {
+    "queue": bench_queue,
+    "priority": bench_priority,
+    "cycles": bench_cycles,
+    "arrivals": bench_arrivals,
+    "encode": bench_encode,
+    "decode": bench_decode,
+    "render": bench_render,
+}
+
+
+def run_suite(names, repeat, scale):
+    results = {}
+    skipped = {}
+    for name in names:
+        try:
+            measured = BENCHMARKS[name](repeat, scale)
+        except ImportError as e:
+            # NumPy and pygame are only needed by the arrivals and render benchmarks
+            skipped[name] = str(e)
+            print(f"  {name:40s} skipped ({e})")
+            continue
+        for key, seconds in measured.items():
+            results[key] = seconds * 1e6
+            print(f"  {key:40s} {seconds * 1e6:12.3f} us/op")
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'scale': scale,
+            'skipped': skipped,
+        },
+        'unit': "us/op",
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print per-benchmark change; returns the names that regressed"""
+    regressions = []
+    print(f"\n  {'benchmark':40s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for key in sorted(set(baseline['results']) | set(current['results'])):
+        old = baseline['results'].get(key)
+        new = current['results'].get(key)
+        if old is None or new is None:
+            print(f"  {key:40s} {'-' if old is None else f'{old:.3f}':>12s} "
+                  f"{'-' if new is None else f'{new:.3f}':>12s}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"  {key:40s} {old:12.3f} {new:12.3f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS),
+                        help="benchmark group to run (repeatable; default all)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark; the fastest is kept")
+    parser.add_argument("--quick", action="store_true", help="a tenth of the default work per run")
+    parser.add_argument("--out", help="save results to this JSON file")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="baseline file, and optionally a results file to compare instead of running")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline and at most one results file")
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+    else:
+        print(f"[BENCH] Python {platform.python_version()}, best of {args.repeat}")
+        current = run_suite(args.only or list(BENCHMARKS), args.repeat, 0.1 if args.quick else 1.0)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"[BENCH] Saved {args.out}")
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n[BENCH] {len(regressions)} regression(s) beyond {args.threshold:g}%: {', '.join(regressions)}")
+            return 1
+        print(f"\n[BENCH] No regressions beyond {args.threshold:g}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
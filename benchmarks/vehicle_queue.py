@@ -0,0 +1,138 @@
+"""Memory and throughput of VehicleQueue against the old linked-list queue.
+
+Run from the repository root:  python benchmarks/vehicle_queue.py [vehicles]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue import VehicleQueue
+from traffic_generator import Vehicle
+
+
+class Node:
+    def __init__(self, data):
+        self.data = data
+        self.next = None
+
+
+class LinkedVehicleQueue:
+    """The singly linked list VehicleQueue this repo used before the ring buffer"""
+    def __init__(self, lane_name):
+        self.lane_name = lane_name
+        self.front = None
+        self.rear = None
+        self._size = 0
+        self.total_vehicles_processed = 0
+
+    def enqueue(self, vehicle):
+        new_node = Node(vehicle)
+        if self.front is None:
+            self.front = new_node
+            self.rear = new_node
+        else:
+            self.rear.next = new_node
+            self.rear = new_node
+        self._size += 1
+
+    def dequeue(self):
+        if self.front is None:
+            return None
+        vehicle = self.front.data
+        self.front = self.front.next
+        if self.front is None:
+            self.rear = None
+        self._size -= 1
+        self.total_vehicles_processed += 1
+        return vehicle
+
+    def get_all_vehicles(self):
+        vehicles = []
+        current = self.front
+        while current:
+            vehicles.append(current.data)
+            current = current.next
+        return vehicles
+
+
+class DictVehicle:
+    """Vehicle record without __slots__, as before"""
+    def __init__(self, vehicle_id, lane, destination, timestamp):
+        self.id = vehicle_id
+        self.lane = lane
+        self.destination = destination
+        self.timestamp = timestamp
+
+
+class SlotVehicle:
+    """Same record with the __slots__ layout Vehicle now uses"""
+    __slots__ = ("id", "lane", "destination", "timestamp")
+
+    def __init__(self, vehicle_id, lane, destination, timestamp):
+        self.id = vehicle_id
+        self.lane = lane
+        self.destination = destination
+        self.timestamp = timestamp
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_queue(queue_class, n, vehicle):
+    q = queue_class("AL2")
+    enqueue = timed(lambda: [q.enqueue(vehicle) for _ in range(n)])
+    head = getattr(q, "peek", None)
+    if head is not None:
+        snapshot = timed(lambda: head(12))
+    else:
+        snapshot = timed(lambda: q.get_all_vehicles()[:12])
+    dequeue = timed(lambda: [q.dequeue() for _ in range(n)])
+    return enqueue, snapshot, dequeue
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    vehicle = Vehicle("V0001", "AL2")
+    print(f"{n:,} queued vehicles\n")
+
+    print("Queue structure only (same vehicle object enqueued n times):")
+    for name, queue_class in (("linked list", LinkedVehicleQueue), ("ring buffer", VehicleQueue)):
+        def build():
+            q = queue_class("AL2")
+            for _ in range(n):
+                q.enqueue(vehicle)
+            return q
+        used = measure_memory(build)
+        print(f"  {name:12s} {used / n:6.1f} bytes/vehicle")
+
+    print("\nVehicle records:")
+    stamp = vehicle.enqueue_ns
+    for name, record in (("__dict__", DictVehicle), ("__slots__", SlotVehicle)):
+        used = measure_memory(lambda: [record(f"V{i:04d}", "AL2", "BL1", stamp) for i in range(n)])
+        print(f"  {name:12s} {used / n:6.1f} bytes/vehicle (incl. id string)")
+
+    print("\nThroughput:")
+    for name, queue_class in (("linked list", LinkedVehicleQueue), ("ring buffer", VehicleQueue)):
+        enqueue, snapshot, dequeue = bench_queue(queue_class, n, vehicle)
+        print(f"  {name:12s} enqueue {n / enqueue / 1e6:5.2f} M/s   "
+              f"dequeue {n / dequeue / 1e6:5.2f} M/s   head-12 snapshot {snapshot * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Encode/decode throughput of the binary frame codec against the old JSON path.
+
+Messages come from a seeded headless TrafficSystem run through the delta
+encoder, so the mix of keyframes and deltas matches a live broadcast.
+
+Run from the repository root:  python benchmarks/wire_protocol.py [cycles]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delta_protocol import DeltaEncoder
+from traffic_generator import TrafficSystem
+from wire_protocol import HEADER_SIZE, decode_payload, encode_frame, parse_header
+
+OLD_HEADER = 64
+
+
+def json_encode(message):
+    """The pre-framing path: JSON body behind a 64-byte space-padded ASCII length"""
+    body = json.dumps(message).encode("utf-8")
+    header = str(len(body)).encode("utf-8")
+    return header + b' ' * (OLD_HEADER - len(header)), body
+
+
+def json_decode(header, body):
+    int(header.decode("utf-8").strip())
+    return json.loads(body.decode("utf-8"))
+
+
+def binary_decode(frame):
+    view = memoryview(frame)
+    codec, length = parse_header(view)
+    return decode_payload(codec, view[HEADER_SIZE:HEADER_SIZE + length])
+
+
+def messages(cycles, keyframes_only):
+    system = TrafficSystem(seed=1, headless=True)
+    encoder = DeltaEncoder()
+    out = []
+    for _ in range(cycles):
+        system.vehicle_adder()
+        system.process_traffic_lights()
+        if keyframes_only:
+            encoder.request_keyframe()
+        out.append(encoder.encode(system.snapshot()))
+    return out
+
+
+def rate(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for label, keyframes_only in (("keyframes", True), ("keyframes + deltas", False)):
+        batch = messages(cycles, keyframes_only)
+        json_frames = [json_encode(m) for m in batch]
+        binary_frames = [encode_frame(m) for m in batch]
+        json_bytes = sum(len(h) + len(b) for h, b in json_frames) / len(batch)
+        binary_bytes = sum(len(f) for f in binary_frames) / len(batch)
+
+        print(f"{label} ({cycles} messages)")
+        print(f"  {'':8s} {'bytes/msg':>10s} {'encode msg/s':>14s} {'decode msg/s':>14s}")
+        print(f"  {'json':8s} {json_bytes:10.0f} {rate(json_encode, batch):14,.0f} "
+              f"{rate(lambda hb: json_decode(*hb), json_frames):14,.0f}")
+        print(f"  {'binary':8s} {binary_bytes:10.0f} {rate(encode_frame, batch):14,.0f} "
+              f"{rate(binary_decode, binary_frames):14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
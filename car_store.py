@@ -0,0 +1,226 @@
+"""Struct-of-arrays storage and per-frame movement for the simulator's cars.
+
+Every car is one row across a set of NumPy arrays (position, road, lane,
+turn target, state), so a frame's movement, stop-line checks, turn
+interpolation and off-screen culling are a handful of array operations
+instead of a Python loop over Car objects.
+
+A car moves through three states:
+
+    APPROACHING  drives toward the intersection along its lane, stops in
+                 the 50 px before the stop line while its light is red, and
+                 keeps FOLLOW_GAP behind the car ahead in the same lane
+    TURNING      heads for the centre of its destination lane
+    EXITING      leaves along the destination road (or straight on, for a
+                 car without a destination) until it is off screen
+
+Following distance is enforced per lane on the lanes' sorted order: with
+cars ranked front to back, a car may advance at most to the position of
+the car ahead minus FOLLOW_GAP, which is a segmented running minimum.
+"""
+import numpy as np
+
+ROADS = "ABCD"
+APPROACHING = 0
+TURNING = 1
+EXITING = 2
+
+# Road -> (axis, direction): axis 0 moves along x, 1 along y
+APPROACH = {"A": (1, 1), "B": (1, -1), "C": (0, -1), "D": (0, 1)}
+EXIT = {"A": (1, -1), "B": (1, 1), "C": (0, 1), "D": (0, -1)}
+
+SPEED = 2.0
+FOLLOW_GAP = 35.0       # Queue spacing used when cars are placed
+STOP_ZONE = 50          # Cars stop in the last 50 px before a red stop line
+ARRIVE_DISTANCE = 3.0   # A turn ends this close to the destination lane centre
+CAR_SIZE = 30
+OFF_SCREEN = 100
+_GROUP_OFFSET = 1e9     # Larger than any forward coordinate + gap * rank
+
+
+class CarStore:
+    """All on-screen cars, one array slot per car"""
+    def __init__(self, lane_rects, stop_lines, width, height, capacity=256):
+        self.lane_rects = lane_rects
+        self.width = width
+        self.height = height
+        self.lane_index = {lane: i for i, lane in enumerate(sorted(lane_rects))}
+        self.stop_line = np.array([stop_lines[road] for road in ROADS], dtype=float)
+        self.count = 0
+        self.present = set()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.ids = np.empty(capacity, dtype="U16")
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.road = np.zeros(capacity, dtype=np.int8)
+        self.lane = np.zeros(capacity, dtype=np.int16)
+        self.axis = np.zeros(capacity, dtype=np.int8)
+        self.direction = np.zeros(capacity)
+        self.target_x = np.zeros(capacity)
+        self.target_y = np.zeros(capacity)
+        self.exit_axis = np.zeros(capacity, dtype=np.int8)
+        self.exit_direction = np.zeros(capacity)
+        self.has_destination = np.zeros(capacity, dtype=bool)
+        self.state = np.zeros(capacity, dtype=np.int8)
+
+    _FIELDS = ("ids", "x", "y", "road", "lane", "axis", "direction", "target_x", "target_y",
+               "exit_axis", "exit_direction", "has_destination", "state")
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in self._FIELDS}
+        self._allocate(self.capacity * 2)
+        for name, values in old.items():
+            getattr(self, name)[:self.count] = values[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self.present
+
+    def add(self, vehicle, position_in_queue):
+        """Place a car for a vehicle dict at its spot in the lane's queue"""
+        vehicle_id = vehicle['id']
+        if vehicle_id in self.present:
+            return False
+        if self.count == self.capacity:
+            self._grow()
+        lane = vehicle['lane']
+        road = lane[0]
+        rect = self.lane_rects[lane]
+        spacing = position_in_queue * FOLLOW_GAP
+        half = CAR_SIZE // 2
+        if road == "A":
+            x, y = rect.centerx - half, rect.top + spacing
+        elif road == "B":
+            x, y = rect.centerx - half, rect.bottom - spacing
+        elif road == "C":
+            x, y = rect.right - spacing, rect.centery - half
+        else:
+            x, y = rect.left + spacing, rect.centery - half
+        axis, direction = APPROACH[road]
+
+        i = self.count
+        self.ids[i] = vehicle_id
+        self.x[i] = x
+        self.y[i] = y
+        self.road[i] = ROADS.index(road)
+        self.lane[i] = self.lane_index[lane]
+        self.axis[i] = axis
+        self.direction[i] = direction
+        destination = vehicle.get('destination')
+        target = self.lane_rects.get(destination)
+        self.has_destination[i] = target is not None
+        if target is not None:
+            self.target_x[i] = target.centerx - half
+            self.target_y[i] = target.centery - half
+            self.exit_axis[i], self.exit_direction[i] = EXIT[destination[0]]
+        else:
+            self.exit_axis[i], self.exit_direction[i] = axis, direction
+        self.state[i] = APPROACHING
+        self.count += 1
+        self.present.add(vehicle_id)
+        return True
+
+    def remove(self, vehicle_ids):
+        """Drop the cars with these ids (unknown ids are ignored)"""
+        gone = [v for v in vehicle_ids if v in self.present]
+        if not gone:
+            return
+        self._keep(~np.isin(self.ids[:self.count], gone))
+        self.present.difference_update(gone)
+
+    def clear(self):
+        self.count = 0
+        self.present.clear()
+
+    def _keep(self, keep):
+        kept = int(keep.sum())
+        for name in self._FIELDS:
+            values = getattr(self, name)
+            values[:kept] = values[:self.count][keep]
+        self.count = kept
+
+    def update(self, green):
+        """Advance every car one frame; `green[r]` is True when road ROADS[r] has green.
+
+        Returns the ids of cars that left the screen (and the store).
+        """
+        n = self.count
+        if not n:
+            return []
+        x, y = self.x[:n], self.y[:n]
+        road, axis, direction = self.road[:n], self.axis[:n], self.direction[:n]
+        state = self.state[:n]
+        approaching = state == APPROACHING
+        turning = state == TURNING
+        exiting = state == EXITING
+
+        # Approaching cars: work in "forward" coordinates, which increase
+        # toward the intersection whatever the road
+        horizontal = axis == 0
+        forward = np.where(horizontal, x, y) * direction
+        line = self.stop_line[road] * direction
+        red = ~np.asarray(green, dtype=bool)[road]
+        stopped = approaching & red & (forward > line - STOP_ZONE) & (forward < line)
+        desired = forward + np.where(approaching & ~stopped, SPEED, 0.0)
+
+        rows = np.flatnonzero(approaching)
+        if rows.size:
+            # Front-to-back order within each lane
+            order = rows[np.lexsort((-forward[rows], self.lane[:n][rows]))]
+            lanes = self.lane[:n][order]
+            new_lane = np.empty(order.size, dtype=bool)
+            new_lane[0] = True
+            new_lane[1:] = lanes[1:] != lanes[:-1]
+            positions = np.arange(order.size)
+            rank = positions - np.maximum.accumulate(np.where(new_lane, positions, 0))
+            group = np.cumsum(new_lane) * _GROUP_OFFSET
+            # limit[i] = min over cars j ahead in the lane of desired[j] - gap * (i - j)
+            reach = desired[order] + FOLLOW_GAP * rank
+            limit = np.minimum.accumulate(reach - group) + group - FOLLOW_GAP * rank
+            moved = np.maximum(forward[order], np.minimum(desired[order], limit))
+            position = moved * direction[order]
+            on_x = horizontal[order]
+            x[order[on_x]] = position[on_x]
+            y[order[~on_x]] = position[~on_x]
+            forward[order] = moved
+
+        passed = approaching & (forward > line + STOP_ZONE)
+        has_destination = self.has_destination[:n]
+        state[passed & has_destination] = TURNING
+        state[passed & ~has_destination] = EXITING
+
+        if turning.any():
+            dx = self.target_x[:n] - x
+            dy = self.target_y[:n] - y
+            distance = np.hypot(dx, dy)
+            arrived = turning & (distance < ARRIVE_DISTANCE)
+            steering = turning & ~arrived
+            step = SPEED / np.where(steering, distance, 1.0)
+            x += np.where(steering, dx * step, 0.0)
+            y += np.where(steering, dy * step, 0.0)
+            state[arrived] = EXITING
+
+        if exiting.any():
+            exit_step = np.where(exiting, SPEED * self.exit_direction[:n], 0.0)
+            exit_horizontal = self.exit_axis[:n] == 0
+            x += np.where(exit_horizontal, exit_step, 0.0)
+            y += np.where(exit_horizontal, 0.0, exit_step)
+
+        off = ((x < -OFF_SCREEN) | (x > self.width + OFF_SCREEN)
+               | (y < -OFF_SCREEN) | (y > self.height + OFF_SCREEN))
+        if not off.any():
+            return []
+        gone = self.ids[:n][off].tolist()
+        self._keep(~off)
+        self.present.difference_update(gone)
+        return gone
+
+    def sprites(self):
+        """(road index, x, y) of every car, as Python ints for blitting"""
+        n = self.count
+        return zip(self.road[:n].tolist(), self.x[:n].astype(int).tolist(), self.y[:n].astype(int).tolist())
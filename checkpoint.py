@@ -0,0 +1,226 @@
+"""Checkpoint a TrafficSystem to a file and restore it exactly.
+
+A checkpoint holds everything the next cycle depends on: every lane's
+queued vehicles in order with their served counts, the lane priority heap
+in its array order with its insertion counter, the lights, the cycle and
+vehicle counters, the random generator state (and an ArrivalGenerator's
+NumPy state and buffered block), the policy parameters and the wait
+histograms. A system restored from it produces the same vehicles, lights
+and statistics as the original would have, so a soak run can start from a
+saturated steady state instead of simulating the warm-up again.
+
+Saving is split so the simulation barely pauses. capture() runs on the
+simulation thread and only copies references: the per-lane vehicle lists,
+histogram counts and small values. Vehicle ids, destinations and enqueue
+stamps never change after a vehicle is created, so a background thread can
+read them, encode the state as zlib-compressed JSON and atomically replace
+the file while the simulation moves on.
+
+    python traffic_generator.py --headless --quiet --speed 0 --cycles 200000 --seed 1 --checkpoint warm.ckpt
+    python traffic_generator.py --restore warm.ckpt --speed 10
+"""
+import json
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+
+from queue import LaneNode, VehicleQueue
+from traffic_generator import Vehicle
+
+MAGIC = b"TCKP"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct("!4sB")
+CHECKPOINT_EVERY = 10000
+PARAMS = ("priority_arrival_rate", "arrival_rate", "priority_high", "priority_low",
+          "priority_green_offset", "green_time_scale")
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def _histogram_state(histogram):
+    return [histogram.precision_bits, list(histogram.counts), histogram.count,
+            histogram.total, histogram.min, histogram.max]
+
+
+def _restore_histogram(histogram, state):
+    precision_bits, counts, count, total, minimum, maximum = state
+    if precision_bits != histogram.precision_bits:
+        raise CheckpointError("histogram precision differs from the checkpoint")
+    histogram.counts = list(counts)
+    histogram.count = count
+    histogram.total = total
+    histogram.min = minimum
+    histogram.max = maximum
+
+
+def capture(system):
+    """Shallow copy of a system's state, cheap enough to take between cycles"""
+    lane_queue = system.lane_priority_queue
+    state = {
+        'captured_ns': time.monotonic_ns(),
+        'seed': system.seed,
+        'policy': repr(system.policy),
+        'params': {name: getattr(system, name) for name in PARAMS},
+        'cycle': system.cycle,
+        'vehicle_counter': system.vehicle_counter,
+        'current_green_road': system.current_green_road,
+        'green_time_remaining': system.green_time_remaining,
+        'green_phase_counts': dict(system.green_phase_counts),
+        'arrival_lanes': list(system.arrival_lanes),
+        # Vehicles are encoded later, off the simulation thread
+        'queues': {lane: (q.get_all_vehicles(), q.total_vehicles_processed)
+                   for lane, q in system.queues.items()},
+        'lane_heap': [[node.lane_name, node.priority, node.order] for node in lane_queue.queue],
+        'lane_counter': lane_queue._counter,
+        'rng': system.rng.getstate(),
+        'wait_cycles': {lane: _histogram_state(h) for lane, h in system.wait_cycles.items()},
+        'wait_ns': {lane: _histogram_state(h) for lane, h in system.wait_ns.items()},
+        'arrivals': system.arrivals.state() if system.arrivals is not None else None,
+    }
+    return state
+
+
+def encode(state):
+    """Checkpoint file bytes for a captured state"""
+    state = dict(state)
+    state['queues'] = {
+        lane: [total, [[v.id, v.destination, v.enqueue_cycle, v.enqueue_ns] for v in vehicles]]
+        for lane, (vehicles, total) in state['queues'].items()}
+    payload = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return CHECKPOINT_HEADER.pack(MAGIC, CHECKPOINT_VERSION) + zlib.compress(payload, 1)
+
+
+def decode(data):
+    if len(data) < CHECKPOINT_HEADER.size or data[:len(MAGIC)] != MAGIC:
+        raise CheckpointError("not a checkpoint file")
+    _, version = CHECKPOINT_HEADER.unpack_from(data, 0)
+    if version != CHECKPOINT_VERSION:
+        raise CheckpointError(f"unsupported checkpoint version {version}")
+    return json.loads(zlib.decompress(data[CHECKPOINT_HEADER.size:]).decode("utf-8"))
+
+
+def write_file(path, data):
+    """Replace `path` atomically, so a crash mid-write keeps the previous checkpoint"""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def save(system, path):
+    """Write a checkpoint on the calling thread"""
+    write_file(path, encode(capture(system)))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+def restore(system, state):
+    """Put a decoded checkpoint's state into `system` (built with the same lanes, arrivals mode and policy)"""
+    if sorted(state['queues']) != sorted(system.queues):
+        raise CheckpointError("checkpoint lanes do not match the system")
+    if (state['arrivals'] is None) != (system.arrivals is None):
+        raise CheckpointError("checkpoint and system disagree on block arrivals (--arrivals)")
+    if state['policy'] != repr(system.policy):
+        # Policies keep no state of their own, but a different one changes every later green phase
+        raise CheckpointError(f"checkpoint was taken under {state['policy']}, not {system.policy!r}")
+
+    # Vehicles keep their age in ns relative to when the state was captured
+    shift_ns = time.monotonic_ns() - state['captured_ns']
+    for lane, (total, vehicles) in state['queues'].items():
+        queue = VehicleQueue(lane)
+        for vehicle_id, destination, enqueue_cycle, enqueue_ns in vehicles:
+            queue.enqueue(Vehicle(vehicle_id, lane, None, enqueue_cycle, destination, enqueue_ns + shift_ns))
+        queue.total_vehicles_processed = total
+        system.queues[lane] = queue
+
+    lane_queue = system.lane_priority_queue
+    lane_queue.queue = []
+    lane_queue.position = {}
+    for index, (lane_name, priority, order) in enumerate(state['lane_heap']):
+        node = LaneNode(lane_name, priority)
+        node.order = order
+        lane_queue.queue.append(node)
+        lane_queue.position[lane_name] = index
+    lane_queue._counter = state['lane_counter']
+    lane_queue._ordered = None
+
+    for name, value in state['params'].items():
+        setattr(system, name, value)
+    system.seed = state['seed']
+    system.cycle = state['cycle']
+    system.vehicle_counter = state['vehicle_counter']
+    system.current_green_road = state['current_green_road']
+    system.green_time_remaining = state['green_time_remaining']
+    system.green_phase_counts = dict(state['green_phase_counts'])
+    system.arrival_lanes = list(state['arrival_lanes'])
+
+    version, internal, gauss_next = state['rng']
+    system.rng = random.Random()
+    system.rng.setstate((version, tuple(internal), gauss_next))
+
+    for lane, histogram_state in state['wait_cycles'].items():
+        _restore_histogram(system.wait_cycles[lane], histogram_state)
+    for lane, histogram_state in state['wait_ns'].items():
+        _restore_histogram(system.wait_ns[lane], histogram_state)
+
+    if state['arrivals'] is not None:
+        system.arrivals.set_state(state['arrivals'])
+    return system
+
+
+class Checkpointer:
+    """Saves a system every `every` cycles, encoding and writing on a background thread.
+
+    If the previous checkpoint is still being written when the next one is
+    due, that one is skipped rather than making the simulation wait.
+    """
+    def __init__(self, path, every=CHECKPOINT_EVERY):
+        self.path = path
+        self.every = every
+        self.saved = 0
+        self.skipped = 0
+        self.last_cycle = None
+        self.error = None
+        self._thread = None
+
+    def maybe_save(self, system):
+        """Call once per cycle"""
+        if self.every and system.cycle % self.every == 0:
+            self.save(system)
+
+    def save(self, system, wait=False):
+        if self._thread is not None and self._thread.is_alive():
+            if not wait:
+                self.skipped += 1
+                return False
+            self._thread.join()
+        state = capture(system)
+        self._thread = threading.Thread(target=self._write, args=(state,), daemon=True)
+        self._thread.start()
+        if wait:
+            self._thread.join()
+        return True
+
+    def _write(self, state):
+        try:
+            write_file(self.path, encode(state))
+        except OSError as e:
+            self.error = e
+            print(f"[CHECKPOINT] could not write {self.path}: {e}")
+            return
+        self.saved += 1
+        self.last_cycle = state['cycle']
+
+    def close(self):
+        """Wait for a checkpoint still being written"""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,8 +1,7 @@
 import socket
-import json
 import threading
-HEADER = 64
-FORMAT = "utf-8"
+
+from wire_protocol import FrameReader, encode_frame
 PORT = 5050
 SERVER = socket.gethostbyname(socket.gethostname())
 ADDR = (SERVER, PORT)
@@ -10,8 +9,6 @@ ADDR = (SERVER, PORT)
 class SocketClient:
     def __init__(self):
         # Socket config
-        self.HEADER = 64
-        self.FORMAT = "utf-8"
         self.PORT = 5050
         self.SERVER = socket.gethostbyname(socket.gethostname())
         self.ADDR = (self.SERVER, self.PORT)
@@ -30,17 +27,30 @@ class SocketClient:
             print(f"[ERROR] {e}")
             return False
     def receive_data(self):
+        reader = FrameReader(self.client)
         try:
          while self.running:
-            msg_length = self.client.recv(self.HEADER).decode(self.FORMAT)
-            if msg_length:
-                msg_length = int(msg_length.strip())
-                msg = self.client.recv(msg_length).decode(self.FORMAT)
-                data = json.loads(msg)
-                if self.data_callback:  # ← Call the callback function instead
-                    self.data_callback(data)
+            data = reader.read_message()
+            if data is None:
+                break
+            if self.data_callback:  # ← Call the callback function instead
+                self.data_callback(data)
         except:
-           self.running = False
+           pass
+        self.running = False
+    def send_data(self, data):
+        try:
+            self.client.sendall(encode_frame(data))
+            return True
+        except OSError:
+            return False
+    def request_keyframe(self):
+        """Ask the server for a full snapshot after a sequence gap"""
+        return self.send_data({'type': 'resync'})
+    def subscribe(self, lanes=None, roads=None, head=12, max_rate=None):
+        """Receive only these lanes/roads, `head` vehicles per lane, at most `max_rate` updates/s"""
+        return self.send_data({'type': 'subscribe', 'lanes': lanes, 'roads': roads,
+                               'head': head, 'max_rate': max_rate})
     def start(self,callback):
        self.data_callback = callback
        if self.connect():
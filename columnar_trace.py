@@ -0,0 +1,213 @@
+"""Columnar traces of a run as chunked, memory-mappable NumPy files (needs NumPy).
+
+trace_file.py records what was broadcast, frame by frame. A columnar trace
+records what happened as plain arrays that analysis code can scan without
+decoding anything. A ColumnarTraceWriter set as TrafficSystem.columns gets
+one row per cycle and one row per served vehicle. Rows are appended to
+array.array buffers (cheaper per row than NumPy item assignment) and
+written out as .npy chunks of `chunk_rows` rows while the run goes:
+
+    DIR/meta.json                   lanes, roads, chunk size, run metadata and totals
+    DIR/cycle.000000.npy            int64 cycle number
+    DIR/lane_sizes.000000.npy       uint32 (rows, lanes) queue length after the cycle
+    DIR/green.000000.npy            int8 index of the road shown green (-1 none)
+    DIR/served.000000.npy           uint8 (rows, lanes) vehicles served in the cycle
+    DIR/vehicle_lane.000000.npy     uint8 lane index
+    DIR/arrival_cycle.000000.npy    int64 cycle the vehicle joined its queue
+    DIR/serve_cycle.000000.npy      int64 cycle it was served (-1: still queued at the end)
+
+Vehicles are written as they are served and close() adds the ones still
+queued. Chunks are written to a temporary name and renamed, so a run that
+dies leaves a trace readable up to its last complete chunk. The writer
+refuses a directory that is not empty unless given overwrite=True, and
+then removes only an earlier trace's meta.json and chunk files.
+ColumnarTrace
+maps the chunks back with np.load(mmap_mode="r"); trace_analysis.py reduces
+them one chunk at a time.
+
+    python traffic_generator.py --headless --quiet --speed 0 --cycles 1000000 --columns run.columns
+    python trace_analysis.py run.columns
+"""
+import array
+import glob
+import json
+import os
+
+import numpy as np
+
+CHUNK_ROWS = 1 << 16
+CYCLE_COLUMNS = ("cycle", "lane_sizes", "green", "served")
+VEHICLE_COLUMNS = ("vehicle_lane", "arrival_cycle", "serve_cycle")
+META_FILE = "meta.json"
+
+
+class ColumnarTraceWriter:
+    """Buffers per-cycle and per-vehicle rows and writes them as .npy chunks"""
+    def __init__(self, directory, lanes, chunk_rows=CHUNK_ROWS, metadata=None, overwrite=False):
+        self.directory = directory
+        self.lanes = list(lanes)
+        self.roads = sorted({lane[0] for lane in self.lanes})
+        self.chunk_rows = chunk_rows
+        self.metadata = dict(metadata or {})
+        self._lane_index = {lane: j for j, lane in enumerate(self.lanes)}
+        self._road_index = {road: r for r, road in enumerate(self.roads)}
+        os.makedirs(directory, exist_ok=True)
+        if os.listdir(directory):
+            if not overwrite:
+                raise FileExistsError(f"{directory} is not empty; use overwrite=True (--columns-overwrite) "
+                                      f"to replace the trace in it")
+            # Chunks of an earlier run would be read as part of this one
+            remove_trace(directory)
+
+        self._no_served = bytes(len(self.lanes))
+        self._new_cycle_buffers()
+        self._new_vehicle_buffers()
+        self.cycle_chunks = 0
+        self.vehicle_chunks = 0
+        self.cycles = 0
+        self.vehicles = 0
+        self.closed = False
+        self._write_meta(complete=False)
+
+    def _new_cycle_buffers(self):
+        self._cycle = array.array("q")
+        self._sizes = array.array("I")
+        self._green = array.array("b")
+        self._served = array.array("B")
+
+    def _new_vehicle_buffers(self):
+        self._vehicle_lanes = array.array("B")
+        self._arrivals = array.array("q")
+        self._serves = array.array("q")
+
+    def record(self, system, served):
+        """One cycle of `system` after step(), with the vehicles it served"""
+        queues = system.queues
+        self._cycle.append(system.cycle)
+        self._sizes.extend([queues[lane].size() for lane in self.lanes])
+        green = system.current_green_road
+        self._green.append(-1 if green is None else self._road_index[green])
+        row = len(self._served)
+        self._served.extend(self._no_served)
+        if served:
+            lane_index = self._lane_index
+            for vehicle in served:
+                j = lane_index[vehicle.lane]
+                self._served[row + j] += 1
+                self._vehicle_lanes.append(j)
+                self._arrivals.append(vehicle.enqueue_cycle)
+                self._serves.append(vehicle.serve_cycle)
+            if len(self._serves) >= self.chunk_rows:
+                self._flush_vehicles()
+        if len(self._cycle) >= self.chunk_rows:
+            self._flush_cycles()
+
+    def _save(self, column, index, buffer, dtype, width=None):
+        values = np.frombuffer(buffer, dtype=buffer.typecode).astype(dtype, copy=False)
+        if width is not None:
+            values = values.reshape(-1, width)
+        path = os.path.join(self.directory, f"{column}.{index:06d}.npy")
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.save(f, values)
+        os.replace(temporary, path)
+
+    def _flush_cycles(self):
+        rows = len(self._cycle)
+        if not rows:
+            return
+        width = len(self.lanes)
+        self._save("cycle", self.cycle_chunks, self._cycle, np.int64)
+        self._save("lane_sizes", self.cycle_chunks, self._sizes, np.uint32, width)
+        self._save("green", self.cycle_chunks, self._green, np.int8)
+        self._save("served", self.cycle_chunks, self._served, np.uint8, width)
+        self._new_cycle_buffers()
+        self.cycle_chunks += 1
+        self.cycles += rows
+
+    def _flush_vehicles(self):
+        rows = len(self._serves)
+        if not rows:
+            return
+        self._save("vehicle_lane", self.vehicle_chunks, self._vehicle_lanes, np.uint8)
+        self._save("arrival_cycle", self.vehicle_chunks, self._arrivals, np.int64)
+        self._save("serve_cycle", self.vehicle_chunks, self._serves, np.int64)
+        self._new_vehicle_buffers()
+        self.vehicle_chunks += 1
+        self.vehicles += rows
+
+    def _write_meta(self, complete):
+        meta = {
+            'lanes': self.lanes,
+            'roads': self.roads,
+            'chunk_rows': self.chunk_rows,
+            'cycles': self.cycles,
+            'vehicles': self.vehicles,
+            'complete': complete,
+            'metadata': self.metadata,
+        }
+        path = os.path.join(self.directory, META_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self, system=None):
+        """Write the remaining rows; with `system`, also its still-queued vehicles (serve_cycle -1)"""
+        if self.closed:
+            return
+        if system is not None:
+            for lane in self.lanes:
+                j = self._lane_index[lane]
+                for vehicle in system.queues[lane].get_all_vehicles():
+                    self._vehicle_lanes.append(j)
+                    self._arrivals.append(vehicle.enqueue_cycle)
+                    self._serves.append(-1)
+                    if len(self._serves) >= self.chunk_rows:
+                        self._flush_vehicles()
+        self._flush_cycles()
+        self._flush_vehicles()
+        self._write_meta(complete=True)
+        self.closed = True
+
+
+def remove_trace(directory):
+    """Delete a columnar trace's own files from `directory`, leaving anything else there"""
+    paths = [os.path.join(directory, META_FILE), os.path.join(directory, META_FILE + ".tmp")]
+    for column in CYCLE_COLUMNS + VEHICLE_COLUMNS:
+        pattern = os.path.join(glob.escape(directory), f"{column}.*.npy")
+        paths += glob.glob(pattern) + glob.glob(pattern + ".tmp")
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ColumnarTrace:
+    """Read side: the chunk files of a columnar trace, memory-mapped one at a time"""
+    def __init__(self, directory):
+        self.directory = directory
+        path = os.path.join(directory, META_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{directory} is not a columnar trace (no {META_FILE})")
+        with open(path) as f:
+            self.meta = json.load(f)
+        self.lanes = self.meta['lanes']
+        self.roads = self.meta['roads']
+        self.metadata = self.meta.get('metadata', {})
+        self._files = {column: sorted(glob.glob(os.path.join(directory, f"{column}.*.npy")))
+                       for column in CYCLE_COLUMNS + VEHICLE_COLUMNS}
+
+    def chunks(self, *columns):
+        """Yield a tuple of memory-mapped arrays per chunk for columns of the same table"""
+        if not set(columns) <= set(CYCLE_COLUMNS) and not set(columns) <= set(VEHICLE_COLUMNS):
+            raise ValueError("columns must all be per-cycle or all per-vehicle")
+        # A run that died mid-flush may have written some columns of its last chunk only
+        count = min(len(self._files[column]) for column in columns)
+        for index in range(count):
+            yield tuple(np.load(self._files[column][index], mmap_mode="r") for column in columns)
+
+    def rows(self, column):
+        """Row count of a column, from the chunk headers only"""
+        return sum(chunk.shape[0] for chunk, in self.chunks(column))
+
+    def __repr__(self):
+        return f"ColumnarTrace({self.directory!r}, lanes={len(self.lanes)})"
@@ -0,0 +1,146 @@
+KEYFRAME_INTERVAL = 50
+
+
+def _diff_window(old, new):
+    """Diff two head-of-queue windows (lists of vehicle dicts, oldest first).
+
+    A FIFO window can only lose vehicles from the front and gain them at the
+    back, so new == old[dropped:] + added. Returns (dequeued_ids, added).
+    """
+    if not old:
+        return [], list(new)
+    if not new:
+        return [v['id'] for v in old], []
+    positions = {v['id']: i for i, v in enumerate(old)}
+    dropped = positions.get(new[0]['id'], len(old))
+    kept = len(old) - dropped
+    if [v['id'] for v in new[:kept]] != [v['id'] for v in old[dropped:]]:
+        # Not a FIFO step (e.g. the queue was replaced); resend the lane
+        return [v['id'] for v in old], list(new)
+    return [v['id'] for v in old[:dropped]], new[kept:]
+
+
+class DeltaEncoder:
+    """Turns full state snapshots into keyframes and per-cycle diffs.
+
+    A keyframe carries the whole snapshot. A delta only lists, per changed
+    lane, the vehicle ids that left the head-of-queue window, the vehicles
+    that joined it and the new lane size, plus the light fields that changed.
+    Every message carries a sequence number so clients can detect gaps.
+    """
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.last_keyframe_seq = None
+        self.keyframe_requested = True
+        self.previous = None
+
+    def request_keyframe(self):
+        self.keyframe_requested = True
+
+    def encode(self, data):
+        self.seq += 1
+        previous = self.previous
+        self.previous = data
+        if (self.keyframe_requested or previous is None
+                or self.seq - self.last_keyframe_seq >= self.keyframe_interval):
+            self.keyframe_requested = False
+            self.last_keyframe_seq = self.seq
+            message = dict(data)
+            message['type'] = 'keyframe'
+            message['seq'] = self.seq
+            return message
+
+        lanes = {}
+        old_queues = previous['queues']
+        for lane, queue_data in data['queues'].items():
+            old = old_queues.get(lane, {'size': 0, 'vehicles': []})
+            dequeued, enqueued = _diff_window(old['vehicles'], queue_data['vehicles'])
+            if dequeued or enqueued or old['size'] != queue_data['size']:
+                change = {'size': queue_data['size']}
+                if dequeued:
+                    change['dequeued'] = dequeued
+                if enqueued:
+                    change['enqueued'] = enqueued
+                lanes[lane] = change
+
+        message = {'type': 'delta', 'seq': self.seq, 'timestamp': data.get('timestamp')}
+        if lanes:
+            message['lanes'] = lanes
+        for key in ('current_green_road', 'green_time_remaining'):
+            if data.get(key) != previous.get(key):
+                message[key] = data.get(key)
+        return message
+
+
+class DeltaDecoder:
+    """Client-side mirror of the encoder's state.
+
+    apply() returns (removed_ids, added) where added is a list of
+    (vehicle, position_in_queue) pairs, or None when the message was dropped
+    because the decoder is waiting for a keyframe after a sequence gap.
+    """
+    def __init__(self):
+        self.seq = None
+        self.queues = {}
+        self.current_green_road = None
+        self.green_time_remaining = 0
+        self.timestamp = None
+        self.needs_keyframe = True
+
+    def apply(self, message):
+        kind = message.get('type', 'keyframe')
+        seq = message.get('seq')
+        if kind == 'keyframe':
+            return self._apply_keyframe(message)
+        if self.needs_keyframe or seq != self.seq + 1:
+            self.needs_keyframe = True
+            return None
+        self.seq = seq
+        return self._apply_delta(message)
+
+    def _apply_keyframe(self, message):
+        removed, added = [], []
+        queues = {}
+        for lane, queue_data in message.get('queues', {}).items():
+            vehicles = list(queue_data.get('vehicles', []))
+            old = self.queues.get(lane, {'vehicles': []})['vehicles']
+            old_ids = {v['id'] for v in old}
+            new_ids = {v['id'] for v in vehicles}
+            removed.extend(v['id'] for v in old if v['id'] not in new_ids)
+            added.extend((v, i) for i, v in enumerate(vehicles) if v['id'] not in old_ids)
+            queues[lane] = {'size': queue_data.get('size', len(vehicles)), 'vehicles': vehicles}
+        for lane, queue_data in self.queues.items():
+            if lane not in queues:
+                removed.extend(v['id'] for v in queue_data['vehicles'])
+
+        self.queues = queues
+        self.seq = message.get('seq')
+        self.current_green_road = message.get('current_green_road')
+        self.green_time_remaining = message.get('green_time_remaining', 0)
+        self.timestamp = message.get('timestamp')
+        self.needs_keyframe = False
+        return removed, added
+
+    def _apply_delta(self, message):
+        removed, added = [], []
+        for lane, change in message.get('lanes', {}).items():
+            queue_data = self.queues.setdefault(lane, {'size': 0, 'vehicles': []})
+            vehicles = queue_data['vehicles']
+            dequeued = change.get('dequeued', ())
+            if dequeued:
+                gone = set(dequeued)
+                vehicles = [v for v in vehicles if v['id'] not in gone]
+                removed.extend(dequeued)
+            for vehicle in change.get('enqueued', ()):
+                added.append((vehicle, len(vehicles)))
+                vehicles.append(vehicle)
+            queue_data['vehicles'] = vehicles
+            queue_data['size'] = change['size']
+
+        if 'current_green_road' in message:
+            self.current_green_road = message['current_green_road']
+        if 'green_time_remaining' in message:
+            self.green_time_remaining = message['green_time_remaining']
+        self.timestamp = message.get('timestamp')
+        return removed, added
@@ -0,0 +1,159 @@
+"""Structured simulation events written off the simulation thread.
+
+TrafficSystem reports what happens as events instead of printing:
+
+    vehicle_added    (debug)  vehicle, lane, size
+    vehicle_served   (debug)  vehicle, lane
+    light_change     (info)   road, green_time
+    priority_change  (info)   lane, priority, size
+    cycle_summary    (info)   green, lanes {lane: size}, priority {lane: priority}
+
+Callers test the `debug` / `info` flags before building an event, so a
+disabled log costs one attribute check per call site. Enabled events are
+appended to a deque and a background thread formats and writes them in
+batches, as JSON lines to a file and/or as the familiar text to the console.
+`sample` keeps that fraction of the per-vehicle (debug) events; light
+changes and summaries are always kept.
+"""
+import collections
+import json
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+LEVELS = {"debug": DEBUG, "info": INFO}
+
+EVENT_LEVELS = {
+    "vehicle_added": DEBUG,
+    "vehicle_served": DEBUG,
+    "light_change": INFO,
+    "priority_change": INFO,
+    "cycle_summary": INFO,
+}
+
+
+def format_console(kind, cycle, fields):
+    """Human-readable text for one event, as the simulation used to print it"""
+    if kind == "vehicle_added":
+        return f"Added {fields['vehicle']} to {fields['lane']} [Size: {fields['size']}]"
+    if kind == "vehicle_served":
+        return f"  ✓ {fields['vehicle']} passed from {fields['lane']}"
+    if kind == "light_change":
+        return f" Road {fields['road']} GREEN (for {fields['green_time']} vehicles)"
+    if kind == "priority_change":
+        if fields['priority'] > 0:
+            return f"  {fields['lane']} PRIORITY (Size: {fields['size']})"
+        return f"  {fields['lane']} priority cleared (Size: {fields['size']})"
+    if kind == "cycle_summary":
+        lines = [f"\n Queue Status (cycle {cycle}):"]
+        for lane, size in fields['lanes'].items():
+            status = "  GREEN" if lane[0] == fields['green'] else "  RED"
+            if fields['priority'].get(lane, 0) > 0:
+                status += "  PRIORITY"
+            lines.append(f"  {lane}: {size:2d} vehicles{status}")
+        lines.append(f"{'=' * 60}")
+        return "\n".join(lines)
+    return f"{kind} {fields}"
+
+
+class EventLog:
+    """Leveled, optionally sampled event log with a buffered background writer"""
+    def __init__(self, path=None, level=INFO, console=False, sample=1.0,
+                 max_pending=100000, batch_size=1024, flush_interval=0.2):
+        if isinstance(level, str):
+            level = LEVELS[level]
+        if not 0.0 <= sample <= 1.0:
+            raise ValueError("sample must be between 0 and 1")
+        self.path = path
+        self.level = level
+        self.console = console
+        self.sample = sample
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+
+        enabled = path is not None or console
+        self.debug = enabled and level <= DEBUG and sample > 0
+        self.info = enabled and level <= INFO
+
+        self._sample_credit = 0.0
+        self._pending = collections.deque()
+        self._wake = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closing = False
+        self._file = None
+        self._thread = None
+        if enabled:
+            if path is not None:
+                self._file = open(path, "a", encoding="utf-8")
+            self._thread = threading.Thread(target=self._write_loop, daemon=True)
+            self._thread.start()
+
+    def emit(self, kind, cycle, **fields):
+        """Queue one event; call only after checking the matching level flag"""
+        if self.sample < 1.0 and EVENT_LEVELS.get(kind, INFO) == DEBUG:
+            # Deterministic sampling: keep exactly `sample` of debug events
+            self._sample_credit += self.sample
+            if self._sample_credit < 1.0:
+                return
+            self._sample_credit -= 1.0
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        pending.append((time.time_ns(), kind, cycle, fields))
+        if len(pending) == self.batch_size:
+            with self._wake:
+                self._wake.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._wake:
+                if not self._closing and len(self._pending) < self.batch_size:
+                    self._wake.wait(self.flush_interval)
+                closing = self._closing
+            self._drain()
+            if closing:
+                return
+
+    def _drain(self):
+        with self._write_lock:
+            pending = self._pending
+            count = len(pending)
+            if not count:
+                return
+            records = [pending.popleft() for _ in range(count)]
+            if self._file is not None:
+                self._file.write("".join(
+                    json.dumps({'ts': ts, 'cycle': cycle, 'event': kind, **fields}) + "\n"
+                    for ts, kind, cycle, fields in records))
+                self._file.flush()
+            if self.console:
+                sys.stdout.write("".join(format_console(kind, cycle, fields) + "\n"
+                                         for _, kind, cycle, fields in records))
+                sys.stdout.flush()
+            self.written += count
+
+    def flush(self):
+        """Write everything queued so far before returning"""
+        if self._thread is not None:
+            self._drain()
+
+    def close(self):
+        if self._thread is None:
+            return
+        with self._wake:
+            self._closing = True
+            self._wake.notify()
+        self._thread.join()
+        self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.debug = self.info = False
+        if self.dropped:
+            print(f"[EVENTS] {self.dropped} events dropped (writer fell behind)", file=sys.stderr)
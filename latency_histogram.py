@@ -0,0 +1,97 @@
+"""Streaming histogram of non-negative integer latencies.
+
+Values below 2**precision_bits are counted exactly. Above that, each power of
+two is split into 2**(precision_bits - 1) equal buckets, so a recorded value
+is off by less than 1 / 2**(precision_bits - 1) of itself (under 2% at the
+default of 7 bits). Recording is O(1) and memory grows with the log of the
+largest value, not with the number of samples, so the same class works for
+waits in cycles and in nanoseconds.
+"""
+
+
+class LatencyHistogram:
+    """Log-bucketed counts with exact count, mean, min and max"""
+    def __init__(self, precision_bits=7):
+        self.precision_bits = precision_bits
+        self.exact_limit = 1 << precision_bits
+        self.half = self.exact_limit >> 1
+        self.counts = [0] * self.exact_limit
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _highest_in_bucket(self, index):
+        if index < self.exact_limit:
+            return index
+        shift, offset = divmod(index - self.exact_limit, self.half)
+        shift += 1
+        return ((self.half + offset + 1) << shift) - 1
+
+    def record(self, value):
+        """Count one sample; negative values are clamped to zero"""
+        if value < 0:
+            value = 0
+        if value < self.exact_limit:
+            index = value
+        else:
+            shift = value.bit_length() - self.precision_bits
+            index = self.exact_limit + (shift - 1) * self.half + (value >> shift) - self.half
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def merge(self, other):
+        """Add another histogram's samples (same precision) into this one"""
+        if other.precision_bits != self.precision_bits:
+            raise ValueError("cannot merge histograms with different precision")
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Smallest bucket bound covering q percent of samples (0 when empty)"""
+        if not self.count:
+            return 0
+        target = max(1, -(-self.count * q // 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._highest_in_bucket(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': round(self.mean(), 3),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+    def reset(self):
+        self.counts = [0] * self.exact_limit
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
@@ -0,0 +1,144 @@
+"""Prometheus text-format metrics for a running generator, served on localhost.
+
+The simulation thread never locks or formats anything for metrics. Values
+that already exist (queue sizes, served counts, cycle and vehicle counters,
+connected clients) are read when the endpoint is scraped, and the few
+counters kept just for metrics are plain attributes written by one thread
+only. Phase timings are LatencyHistograms in nanoseconds, turned into
+cumulative Prometheus buckets at scrape time. The arrivals and lights
+phases are timed on every `sample_every`-th cycle; the broadcast phase
+(snapshot, encode and send) is timed on every broadcast.
+
+    python traffic_generator.py --metrics-port 9108
+    curl -s localhost:9108/metrics
+"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from latency_histogram import LatencyHistogram
+
+PHASES = ("arrivals", "lights", "broadcast")
+SAMPLE_EVERY = 16
+# Bucket upper bounds in seconds for the exported histograms
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+           1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def histogram_lines(name, histogram, labels=None):
+    """Prometheus bucket/sum/count lines for a LatencyHistogram of nanoseconds"""
+    bounds_ns = [bound * 1e9 for bound in BUCKETS]
+    buckets = [0] * (len(BUCKETS) + 1)
+    counts = list(histogram.counts)     # Copy: the simulation thread may grow it
+    for index, n in enumerate(counts):
+        if n:
+            buckets[bisect.bisect_left(bounds_ns, histogram._highest_in_bucket(index))] += n
+    lines = []
+    cumulative = 0
+    for bound, n in zip(BUCKETS, buckets):
+        cumulative += n
+        lines.append(f"{name}_bucket{_labels({**(labels or {}), 'le': repr(bound)})} {cumulative}")
+    total = cumulative + buckets[-1]
+    lines.append(f"{name}_bucket{_labels({**(labels or {}), 'le': '+Inf'})} {total}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.total / 1e9:.9f}")
+    lines.append(f"{name}_count{_labels(labels)} {total}")
+    return lines
+
+
+class Metrics:
+    """Collects a TrafficSystem's (and its socket server's) metrics"""
+    def __init__(self, system, sample_every=SAMPLE_EVERY):
+        self.system = system
+        self.sample_every = sample_every
+        self.phase_ns = {phase: LatencyHistogram() for phase in PHASES}
+
+    def render(self):
+        """The current metrics in Prometheus text exposition format"""
+        system = self.system
+        out = []
+
+        def metric(name, kind, help_text, samples):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                out.append(f"{name}{_labels(labels)} {value}")
+
+        queues = system.queues
+        metric("traffic_lane_queue_depth", "gauge", "Vehicles waiting in the lane",
+               [({'lane': lane}, queues[lane].size()) for lane in system.lanes])
+        metric("traffic_lane_served_total", "counter", "Vehicles served from the lane",
+               [({'lane': lane}, queues[lane].total_vehicles_processed) for lane in system.lanes])
+        metric("traffic_cycles_total", "counter", "Simulation cycles run", [(None, system.cycle)])
+        metric("traffic_vehicles_generated_total", "counter", "Vehicles added to any lane",
+               [(None, system.vehicle_counter)])
+        metric("traffic_green_road", "gauge", "1 for the road that has green",
+               [({'road': road}, int(road == system.current_green_road)) for road in "ABCD"])
+
+        out.append("# HELP traffic_cycle_phase_seconds Time spent in each part of a cycle")
+        out.append("# TYPE traffic_cycle_phase_seconds histogram")
+        for phase, histogram in self.phase_ns.items():
+            out.extend(histogram_lines("traffic_cycle_phase_seconds", histogram, {'phase': phase}))
+
+        server = system.socket_server
+        if server is not None:
+            metric("traffic_broadcasts_total", "counter", "States encoded and broadcast",
+                   [(None, server.broadcasts)])
+            metric("traffic_broadcast_bytes_total", "counter", "Bytes of broadcast frames, counted once",
+                   [(None, server.broadcast_bytes)])
+            metric("traffic_sent_bytes_total", "counter", "Bytes sent to all clients",
+                   [(None, server.sent_bytes)])
+            metric("traffic_connected_clients", "gauge", "Clients connected to the server",
+                   [(None, len(server.connected_clients))])
+            out.append("# HELP traffic_client_send_seconds Time to send a broadcast frame to each client")
+            out.append("# TYPE traffic_client_send_seconds histogram")
+            for client, histogram in server.send_latencies():
+                out.extend(histogram_lines("traffic_client_send_seconds", histogram, {'client': client}))
+        return "\n".join(out) + "\n"
+
+
+class MetricsEndpoint:
+    """Serves Metrics.render() at /metrics from a background thread"""
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"[METRICS] http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
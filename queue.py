@@ -1,72 +1,120 @@
-class Node:
-    def __init__(self, data):
-        self.data = data
-        self.next = None
-
 class VehicleQueue:
+    """FIFO queue of vehicles stored in a growable ring buffer.
+
+    Slots are reused as vehicles are dequeued, so a queued vehicle costs one
+    list slot instead of a linked-list node, and reading the head of the
+    queue with peek(k) only touches k slots.
+    """
+    INITIAL_CAPACITY = 16
+    
     def __init__(self, lane_name):
         self.lane_name = lane_name
-        self.front = None
-        self.rear = None
+        self._buffer = [None] * self.INITIAL_CAPACITY
+        self._head = 0
         self._size = 0
         self.total_vehicles_processed = 0
     
     def enqueue(self, vehicle):
-        new_node = Node(vehicle)
-        if self.is_empty():
-            self.front = new_node
-            self.rear = new_node
-        else:
-            self.rear.next = new_node
-            self.rear = new_node
+        buffer = self._buffer
+        capacity = len(buffer)
+        if self._size == capacity:
+            self._grow()
+            buffer = self._buffer
+            capacity = len(buffer)
+        tail = self._head + self._size
+        if tail >= capacity:
+            tail -= capacity
+        buffer[tail] = vehicle
         self._size += 1
     
     def dequeue(self):
-        if self.is_empty():
+        if self._size == 0:
             return None
-        vehicle = self.front.data
-        self.front = self.front.next
-        if self.front is None:
-            self.rear = None
+        buffer = self._buffer
+        head = self._head
+        vehicle = buffer[head]
+        buffer[head] = None
+        head += 1
+        self._head = 0 if head == len(buffer) else head
         self._size -= 1
         self.total_vehicles_processed += 1
         return vehicle
     
+    def _grow(self):
+        """Double the buffer, moving the queue to start at slot 0"""
+        self._buffer = self.peek(self._size) + [None] * len(self._buffer)
+        self._head = 0
+    
     def is_empty(self):
-        return self.front is None
+        return self._size == 0
     
     def size(self):
         return self._size
     
+    def peek(self, k=1):
+        """Return up to k vehicles from the front of the queue, oldest first"""
+        k = min(k, self._size)
+        start = self._head
+        end = start + k
+        capacity = len(self._buffer)
+        if end <= capacity:
+            return self._buffer[start:end]
+        return self._buffer[start:] + self._buffer[:end - capacity]
+    
     def get_all_vehicles(self):
         """Return list of all vehicles in queue"""
-        vehicles = []
-        current = self.front
-        while current:
-            vehicles.append(current.data)
-            current = current.next
-        return vehicles
+        return self.peek(self._size)
+
+
 class LaneNode:
     def __init__(self, lane_name, priority=0):
         self.lane_name = lane_name
         self.priority = priority
+        self.order = 0
     
     def __repr__(self):
         return f"LaneNode({self.lane_name}, priority={self.priority})"
 
 
 class LanePriorityQueue:
+    """Indexed binary max-heap of lanes.
+
+    Higher priority is served first. Lanes with equal priority keep the order
+    a stable sort by priority would leave them in: a new lane or one whose
+    priority rose goes behind the lanes already at that priority, and one
+    whose priority dropped goes ahead of them. `order` carries this as one
+    counter, +n to go last and -n to go first. `position` maps lane name ->
+    heap index so priority updates and lookups don't scan the queue.
+    """
     def __init__(self):
         self.queue = []
+        self.position = {}
+        self._counter = 0
+        self._ordered = None
     
     def enqueue(self, lane_node):
+        if lane_node.lane_name in self.position:
+            return self.update_priority(lane_node.lane_name, lane_node.priority)
+        self._counter += 1
+        lane_node.order = self._counter
         self.queue.append(lane_node)
-        self._sort_by_priority()
+        self.position[lane_node.lane_name] = len(self.queue) - 1
+        self._sift_up(len(self.queue) - 1)
+        self._ordered = None
+        return True
     
     def dequeue(self):
-        if not self.is_empty():
-            return self.queue.pop(0)
-        return None
+        if self.is_empty():
+            return None
+        top = self.queue[0]
+        last = self.queue.pop()
+        del self.position[top.lane_name]
+        if self.queue:
+            self.queue[0] = last
+            self.position[last.lane_name] = 0
+            self._sift_down(0)
+        self._ordered = None
+        return top
     
     def peek(self):
         if not self.is_empty():
@@ -74,21 +122,66 @@ class LanePriorityQueue:
         return None
     
     def update_priority(self, lane_name, new_priority):
-        for node in self.queue:
-            if node.lane_name == lane_name:
-                node.priority = new_priority
-                self._sort_by_priority()
-                return True
-        return False
+        index = self.position.get(lane_name)
+        if index is None:
+            return False
+        node = self.queue[index]
+        if node.priority == new_priority:
+            return True
+        old_priority = node.priority
+        node.priority = new_priority
+        self._counter += 1
+        if new_priority > old_priority:
+            node.order = self._counter
+            self._sift_up(index)
+        else:
+            node.order = -self._counter
+            self._sift_down(index)
+        self._ordered = None
+        return True
     
     def get_priority(self, lane_name):
-        for node in self.queue:
-            if node.lane_name == lane_name:
-                return node.priority
-        return None
-    
-    def _sort_by_priority(self):
-        self.queue.sort(key=lambda x: x.priority, reverse=True)
+        index = self.position.get(lane_name)
+        if index is None:
+            return None
+        return self.queue[index].priority
+    
+    def _before(self, a, b):
+        """True if lane node a should be served before b"""
+        if a.priority != b.priority:
+            return a.priority > b.priority
+        return a.order < b.order
+    
+    def _swap(self, i, j):
+        queue = self.queue
+        queue[i], queue[j] = queue[j], queue[i]
+        self.position[queue[i].lane_name] = i
+        self.position[queue[j].lane_name] = j
+    
+    def _sift_up(self, index):
+        queue = self.queue
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not self._before(queue[index], queue[parent]):
+                break
+            self._swap(index, parent)
+            index = parent
+    
+    def _sift_down(self, index):
+        queue = self.queue
+        n = len(queue)
+        while True:
+            best = index
+            left = 2 * index + 1
+            right = left + 1
+            if left < n and self._before(queue[left], queue[best]):
+                best = left
+            if right < n and self._before(queue[right], queue[best]):
+                best = right
+            if best == index:
+                break
+            self._swap(index, best)
+            index = best
     
     def is_empty(self):
         return len(self.queue) == 0
@@ -97,8 +190,10 @@ class LanePriorityQueue:
         return len(self.queue)
     
     def get_all_lanes(self):
-        return list(self.queue)
+        """Return all lanes sorted by priority (cached until the next change)"""
+        if self._ordered is None:
+            self._ordered = sorted(self.queue, key=lambda x: (-x.priority, x.order))
+        return list(self._ordered)
     
     def __repr__(self):
         return f"LanePriorityQueue(size={self.size()})"
-
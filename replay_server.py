@@ -0,0 +1,165 @@
+"""Serve a recorded trace to simulator.py or any socket client.
+
+The trace is memory-mapped (trace_file.TraceReader) and every state is
+re-broadcast through the normal SocketServer or AsyncSocketServer, so
+clients connect, get keyframes and resync exactly as they do with a live
+traffic generator. Playback runs at the recorded cycle interval divided by
+`speed`; speed 0 sends as fast as the server accepts frames.
+
+    python traffic_generator.py --headless --quiet --seed 7 --speed 0 --cycles 20000 --record peak.trace
+    python replay_server.py peak.trace --speed 4 --start 5000
+    python replay_server.py peak.trace --speed 0 --loop --controls
+
+With --controls, lines typed on stdin steer playback: `seek CYCLE`,
+`speed N`, `pause`, `resume` and `quit`.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from trace_file import TraceReader
+
+DEFAULT_INTERVAL = 0.5
+
+
+class ReplayServer:
+    """Plays trace states into a server's broadcast_data at a chosen speed"""
+    def __init__(self, trace, server, speed=1.0, interval=None):
+        self.trace = trace
+        self.server = server
+        self.speed = speed
+        recorded = trace.metadata.get('interval')
+        # Traces recorded with interval 0 have no pace of their own; use the default
+        self.interval = interval if interval is not None else (recorded or DEFAULT_INTERVAL)
+        self.position = 0
+        self.running = False
+        self.paused = threading.Event()
+        self._seek_to = None
+        self._lock = threading.Lock()
+
+    def seek(self, cycle):
+        """Continue playback from `cycle` (0-based) after the current frame"""
+        with self._lock:
+            self._seek_to = max(0, min(cycle, len(self.trace) - 1))
+
+    def set_speed(self, speed):
+        self.speed = max(0.0, speed)
+
+    def pause(self):
+        self.paused.set()
+
+    def resume(self):
+        self.paused.clear()
+
+    def stop(self):
+        self.running = False
+        self.paused.clear()
+
+    def run(self, start=0, end=None, loop=False):
+        """Broadcast states from `start` to `end`; returns the number sent"""
+        end = len(self.trace) if end is None else min(end, len(self.trace))
+        sent = 0
+        self.running = True
+        self.seek(start)
+        states = iter(())
+        deadline = time.perf_counter()
+        while self.running:
+            with self._lock:
+                seek_to, self._seek_to = self._seek_to, None
+            if seek_to is not None:
+                states = self.trace.states(seek_to, end)
+                # Clients diff against what they saw before the jump
+                self.server.subscriptions.request_keyframe()
+                deadline = time.perf_counter()
+            if self.paused.is_set():
+                time.sleep(0.05)
+                deadline = time.perf_counter()
+                continue
+
+            item = next(states, None)
+            if item is None:
+                if loop and end > start:
+                    self.seek(start)
+                    continue
+                break
+            self.position, state = item
+            self.server.broadcast_data(state)
+            sent += 1
+
+            if self.speed > 0:
+                deadline += self.interval / self.speed
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -self.interval:
+                    # Fell behind (slow clients or a pause); don't burst to catch up
+                    deadline = time.perf_counter()
+        self.running = False
+        return sent
+
+
+def read_controls(replay):
+    for line in sys.stdin:
+        command, _, argument = line.strip().partition(" ")
+        try:
+            if command == "seek":
+                replay.seek(int(argument))
+            elif command == "speed":
+                replay.set_speed(float(argument))
+            elif command == "pause":
+                replay.pause()
+            elif command == "resume":
+                replay.resume()
+            elif command == "quit":
+                replay.stop()
+                return
+            else:
+                print("[REPLAY] commands: seek CYCLE, speed N, pause, resume, quit")
+                continue
+        except ValueError:
+            print(f"[REPLAY] bad argument for {command}: {argument!r}")
+            continue
+        print(f"[REPLAY] {command} {argument} (at cycle {replay.position})".rstrip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded trace to socket clients")
+    parser.add_argument("trace", help="trace file written by traffic_generator.py --record")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed (0 = as fast as possible)")
+    parser.add_argument("--interval", type=float, help="seconds per cycle at 1x (default: as recorded)")
+    parser.add_argument("--start", type=int, default=0, help="first cycle to play")
+    parser.add_argument("--end", type=int, help="stop before this cycle")
+    parser.add_argument("--loop", action="store_true", help="start over at the end")
+    parser.add_argument("--server", choices=["threaded", "asyncio"], default="threaded")
+    parser.add_argument("--controls", action="store_true", help="read seek/speed/pause commands from stdin")
+    args = parser.parse_args()
+
+    trace = TraceReader(args.trace)
+    meta = trace.metadata
+    print(f"[REPLAY] {args.trace}: {len(trace)} cycles, seed {meta.get('seed')}, {meta.get('policy')}")
+    if args.server == "asyncio":
+        from async_server_socket import AsyncSocketServer
+        server = AsyncSocketServer()
+    else:
+        from server_socket import SocketServer
+        server = SocketServer()
+    server.start()
+
+    replay = ReplayServer(trace, server, speed=args.speed, interval=args.interval)
+    if args.controls:
+        threading.Thread(target=read_controls, args=(replay,), daemon=True).start()
+    start = time.perf_counter()
+    try:
+        sent = replay.run(args.start, args.end, loop=args.loop)
+        elapsed = time.perf_counter() - start
+        print(f"[REPLAY] Sent {sent} cycles in {elapsed:.2f}s")
+    except KeyboardInterrupt:
+        print(f"\n[REPLAY] Stopped at cycle {replay.position}")
+    finally:
+        server.stop()
+        trace.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Grid of TrafficSystem intersections connected through their L1 exits.
+
+A vehicle served towards `XL1` leaves its intersection on road X and joins
+the neighbouring intersection on the opposite road: leaving north (A) it
+arrives at the neighbour's south approach (B), and so on. Vehicles leaving
+the edge of the grid exit the network.
+
+The grid can be split into bands of rows, one per worker process. Each
+cycle every band steps its intersections, then swaps the vehicles that
+crossed a band boundary with the bands above and below in one batch.
+Transfers are applied in a fixed order, so a partitioned run gives the same
+result as a single-process run with the same seed.
+
+    python road_network.py --rows 100 --cols 100 --cycles 200 --workers 8
+"""
+import argparse
+import multiprocessing
+import signal
+import time
+
+from traffic_generator import TrafficSystem, Vehicle
+
+# Exit road -> (row step, column step, road the vehicle arrives on)
+EXITS = {"A": (-1, 0, "B"), "B": (1, 0, "A"), "C": (0, 1, "D"), "D": (0, -1, "C")}
+
+
+class GridPartition:
+    """The intersections in rows [row_start, row_end) of a rows x cols grid"""
+    def __init__(self, rows, cols, row_start, row_end, seed=0, arrivals="boundary", **params):
+        self.rows = rows
+        self.cols = cols
+        self.row_start = row_start
+        self.row_end = row_end
+        self.cycle = 0
+        self.intersections = {}
+        for r in range(row_start, row_end):
+            for c in range(cols):
+                system = TrafficSystem(seed=f"{seed}:{r}:{c}", headless=True, **params)
+                if arrivals == "boundary":
+                    # Only roads coming from outside the grid get new vehicles
+                    outside = {"A": r == 0, "B": r == rows - 1, "C": c == cols - 1, "D": c == 0}
+                    system.arrival_lanes = [lane for lane in system.lanes if outside[lane[0]]]
+                self.intersections[(r, c)] = system
+        self.inbound = []
+        self.generated = 0
+        self.served = 0
+        self.exited = 0
+        self.transferred = 0
+        self.received = 0
+
+    def owns(self, row):
+        return self.row_start <= row < self.row_end
+
+    def deliver(self, transfers):
+        """Queue vehicles handed over by neighbours for the next cycle"""
+        self.inbound.extend(transfers)
+
+    def step(self):
+        """Run one cycle; returns transfers bound for rows outside this band"""
+        self.cycle += 1
+        # Canonical order: (target row, target col, source row, source col, index)
+        inbound = sorted(self.inbound)
+        self.inbound = []
+        for r, c, _, _, _, road in inbound:
+            system = self.intersections[(r, c)]
+            lane = road + system.rng.choice(("L2", "L3"))
+            # Every intersection numbers vehicles from its own counter, so an
+            # arriving vehicle gets a new id there; keeping the source's id
+            # could put two vehicles with the same id in one queue
+            system.vehicle_counter += 1
+            vehicle_id = f"V{system.vehicle_counter:04d}"
+            # Joins the queue at the start of the intersection's next cycle
+            system.queues[lane].enqueue(Vehicle(vehicle_id, lane, system.rng, system.cycle + 1))
+        self.received += len(inbound)
+
+        outbound = []
+        for (r, c), system in self.intersections.items():
+            before = system.vehicle_counter
+            served = system.step()
+            self.generated += system.vehicle_counter - before
+            self.served += len(served)
+            for index, vehicle in enumerate(served):
+                if not vehicle.destination:
+                    continue
+                dr, dc, arrive_road = EXITS[vehicle.destination[0]]
+                tr, tc = r + dr, c + dc
+                if not (0 <= tr < self.rows and 0 <= tc < self.cols):
+                    self.exited += 1
+                    continue
+                transfer = (tr, tc, r, c, index, arrive_road)
+                if self.owns(tr):
+                    self.inbound.append(transfer)
+                else:
+                    outbound.append(transfer)
+        self.transferred += len(outbound)
+        return outbound
+
+    def queued(self):
+        return sum(q.size() for system in self.intersections.values() for q in system.queues.values())
+
+    def stats(self):
+        max_queue = max((q.size() for system in self.intersections.values()
+                         for q in system.queues.values()), default=0)
+        return {
+            'intersections': len(self.intersections),
+            'generated': self.generated,
+            'served': self.served,
+            'exited': self.exited,
+            'crossed_partitions': self.transferred,
+            'queued': self.queued() + len(self.inbound),
+            'max_lane_queue': max_queue,
+        }
+
+
+class RoadNetwork(GridPartition):
+    """Whole grid in this process"""
+    def __init__(self, rows, cols, seed=0, arrivals="boundary", **params):
+        super().__init__(rows, cols, 0, rows, seed=seed, arrivals=arrivals, **params)
+
+    def run(self, cycles):
+        for _ in range(cycles):
+            self.step()
+        return self.stats()
+
+
+def _merge_stats(parts):
+    totals = {}
+    for part in parts:
+        for key, value in part.items():
+            if key == 'max_lane_queue':
+                totals[key] = max(totals.get(key, 0), value)
+            else:
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _partition_worker(spec, up, down, result):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    rows, cols, row_start, row_end, seed, arrivals, params, cycles = spec
+    partition = GridPartition(rows, cols, row_start, row_end, seed=seed, arrivals=arrivals, **params)
+    start = time.perf_counter()
+    for _ in range(cycles):
+        outbound = partition.step()
+        # Only A/B exits cross a band boundary, so every transfer goes to
+        # the band directly above or below. Batches are a few KB per cycle,
+        # well within the socket buffer, so sending before receiving can't
+        # deadlock.
+        if up is not None:
+            up.send([t for t in outbound if t[0] < row_start])
+        if down is not None:
+            down.send([t for t in outbound if t[0] >= row_end])
+        if up is not None:
+            partition.deliver(up.recv())
+        if down is not None:
+            partition.deliver(down.recv())
+    stats = partition.stats()
+    stats['seconds'] = time.perf_counter() - start
+    result.send(stats)
+    result.close()
+
+
+def run_partitioned(rows, cols, cycles, workers, seed=0, arrivals="boundary", **params):
+    """Run the grid split into `workers` bands of rows, one process each"""
+    workers = max(1, min(workers, rows))
+    bounds = [rows * i // workers for i in range(workers + 1)]
+    links = [multiprocessing.Pipe() for _ in range(workers - 1)]
+    results = []
+    processes = []
+    for i in range(workers):
+        up = links[i - 1][1] if i > 0 else None
+        down = links[i][0] if i < workers - 1 else None
+        parent, child = multiprocessing.Pipe(duplex=False)
+        spec = (rows, cols, bounds[i], bounds[i + 1], seed, arrivals, params, cycles)
+        process = multiprocessing.Process(target=_partition_worker, args=(spec, up, down, child), daemon=True)
+        process.start()
+        child.close()
+        results.append(parent)
+        processes.append(process)
+    try:
+        parts = [conn.recv() for conn in results]
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    stats = _merge_stats(parts)
+    stats['seconds'] = max(part['seconds'] for part in parts)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a grid of intersections")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--cycles", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--arrivals", choices=["boundary", "all"], default="boundary",
+                        help="which intersections get new vehicles from vehicle_adder")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        stats = run_partitioned(args.rows, args.cols, args.cycles, args.workers,
+                                seed=args.seed, arrivals=args.arrivals)
+    else:
+        stats = RoadNetwork(args.rows, args.cols, seed=args.seed, arrivals=args.arrivals).run(args.cycles)
+    elapsed = time.perf_counter() - start
+    cells = args.rows * args.cols * args.cycles
+    print(f"{args.rows}x{args.cols} grid, {args.cycles} cycles on {args.workers} workers: "
+          f"{elapsed:.2f}s ({cells / elapsed:,.0f} intersection-cycles/s)")
+    for key, value in stats.items():
+        if key != 'seconds':
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
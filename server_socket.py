@@ -1,11 +1,12 @@
 import socket
 import threading
-import json
 import time
+
+from latency_histogram import LatencyHistogram
+from subscriptions import Subscription, SubscriptionRegistry
+from wire_protocol import FrameReader, encode_frame
 class SocketServer:
     def __init__(self):
-        self.HEADER = 64
-        self.FORMAT = "utf-8"
         self.PORT = 5050
         self.SERVER = socket.gethostbyname(socket.gethostname())
         self.ADDR = (self.SERVER, self.PORT)
@@ -13,36 +14,78 @@ class SocketServer:
         self.server.bind(self.ADDR)
         self.connected_clients = []
         self.running = False
+        # Clients get keyframes plus per-cycle deltas (see delta_protocol.py),
+        # encoded once per distinct subscription (see subscriptions.py)
+        self.subscriptions = SubscriptionRegistry()
+        # Counters for metrics.py, only written by the broadcasting thread
+        self.broadcasts = 0
+        self.broadcast_bytes = 0
+        self.sent_bytes = 0
+        self.send_latency = {}  # conn -> (addr, LatencyHistogram of sendall time in ns)
+    
+    def send_frame(self, conn, frame):
+        """Send one already framed message in a single call"""
+        conn.sendall(frame)
     
     def send_to_client(self, conn, data):
-        message = json.dumps(data)
-        msg_encoded = message.encode(self.FORMAT)
-        msg_length = len(msg_encoded)
-        send_length = str(msg_length).encode(self.FORMAT)
-        send_length += b' ' * (self.HEADER - len(send_length))
         try:
-            conn.send(send_length)
-            conn.send(msg_encoded)
-        except:
-            pass
+            self.send_frame(conn, encode_frame(data))
+            return True
+        except OSError:
+            return False
     
     def broadcast_data(self, data):
-        for conn in self.connected_clients[:]:
-            try:
-                self.send_to_client(conn, data)
-            except:
-                self.connected_clients.remove(conn)
+        # Encode once per subscription, send the same bytes to its clients
+        frames = self.subscriptions.frames(data)
+        if not frames:
+            return
+        self.broadcasts += 1
+        send_latency = self.send_latency
+        for frame, clients in frames:
+            self.broadcast_bytes += len(frame)
+            for conn in clients:
+                try:
+                    start = time.perf_counter_ns()
+                    self.send_frame(conn, frame)
+                    stats = send_latency.get(conn)
+                    if stats:
+                        stats[1].record(time.perf_counter_ns() - start)
+                    self.sent_bytes += len(frame)
+                except OSError:
+                    if conn in self.connected_clients:
+                        self.connected_clients.remove(conn)
+                    self.subscriptions.leave(conn)
+    
+    def send_latencies(self):
+        """[(client address, LatencyHistogram)] for the connected clients"""
+        return [(f"{addr[0]}:{addr[1]}", histogram) for addr, histogram in list(self.send_latency.values())]
     
     def handle_client(self, conn, addr):
         print(f"[NEW CONNECTION] {addr} connected")
+        self.send_latency[conn] = (addr, LatencyHistogram())
         self.connected_clients.append(conn)
+        self.subscriptions.join(conn)
+        reader = FrameReader(conn, size=256)
         try:
             while self.running:
-                time.sleep(0.1)
+                request = reader.read_message()
+                if request is None:
+                    break
+                kind = request.get('type')
+                if kind == 'resync':
+                    # Client saw a sequence gap
+                    self.subscriptions.request_keyframe(conn)
+                elif kind == 'subscribe':
+                    try:
+                        self.subscriptions.join(conn, Subscription.from_message(request))
+                    except ValueError as e:
+                        print(f"[SUBSCRIBE] {addr} ignored: {e}")
         except:
             pass
         if conn in self.connected_clients:
             self.connected_clients.remove(conn)
+        self.subscriptions.leave(conn)
+        self.send_latency.pop(conn, None)
         conn.close()
         print(f"[DISCONNECTED] {addr} disconnected")
     
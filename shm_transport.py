@@ -0,0 +1,237 @@
+"""Same-host transport through shared memory instead of TCP.
+
+The generator writes each broadcast state into a fixed-layout block of
+multiprocessing.shared_memory; any number of readers on the machine map the
+same block and copy the newest state out of it without a socket, a
+syscall or a JSON/frame decode. TCP (server_socket.py) stays the transport
+for remote clients; both can run at once.
+
+Layout (little-endian):
+
+    header   magic "TSHM", version, lane count, head vehicles per lane, writer pid
+    seq      u64 sequence lock: odd while the writer is updating the body
+    body     message seq, timestamp, green road, green time, then per lane
+             its code, vehicle count and size, followed by `head` vehicle
+             slots of (id number, lane code, destination code)
+
+Lanes, roads and destinations use wire_protocol's codes and vehicle ids
+must be of the V<number> form. The writer packs the whole body into a
+staging buffer first, so the odd (busy) window is one memory copy. A
+reader copies the body out between two reads of the sequence counter and
+retries if the counter moved, so it never sees a half-written state.
+
+A writer that finds the name taken replaces the block only if the process
+recorded in its header has exited (a crashed writer's leftover). A block
+whose writer is still running, or that is not a traffic state block at
+all, is refused unless the writer is created with force=True.
+
+    python traffic_generator.py --shm traffic_state
+    python simulator.py --shm traffic_state
+"""
+import math
+import os
+import struct
+from datetime import datetime
+from multiprocessing import shared_memory
+
+from wire_protocol import (LANE_CODES, NONE_CODE, ROAD_CODES, _DEST_CODES, _DEST_INDEX, _LANE_INDEX,
+                           _ROAD_INDEX, _vehicle_id, _vehicle_number)
+
+MAGIC = b"TSHM"
+SHM_VERSION = 1
+DEFAULT_NAME = "traffic_state"
+_HEADER = struct.Struct("<4sHHHHI")    # magic, version, lane count, head, reserved, writer pid
+_SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 16
+BODY_OFFSET = 24
+_STATE = "QdB3xi"                       # message seq, timestamp, green road, green time
+_LANE = "BxHI"                          # lane code, vehicle count, size
+_VEHICLE = "IBBxx"                      # id number, lane code, destination code
+READ_RETRIES = 100
+
+_written = set()                        # Names of blocks this process's writers created
+
+
+def body_struct(lane_count, head):
+    return struct.Struct("<" + _STATE + (_LANE + _VEHICLE * head) * lane_count)
+
+
+class SharedStateWriter:
+    """Single writer: creates the block and publishes broadcast states into it"""
+    def __init__(self, name=DEFAULT_NAME, lanes=None, head=12, force=False):
+        self.lanes = list(lanes or LANE_CODES)
+        self.head = head
+        self.body = body_struct(len(self.lanes), head)
+        size = BODY_OFFSET + self.body.size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            if not force:
+                _check_stale(name)
+            # Left behind by a writer that crashed (or replaced on request); start over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        _written.add(self.name)
+        self.buf = self.shm.buf
+        _HEADER.pack_into(self.buf, 0, MAGIC, SHM_VERSION, len(self.lanes), head, 0, os.getpid())
+        _SEQ.pack_into(self.buf, SEQ_OFFSET, 0)
+        self.seq = 0
+        self.published = 0
+        self._staging = bytearray(self.body.size)
+        self._empty = (0, NONE_CODE, NONE_CODE) * head
+
+    def publish(self, data):
+        """Write one broadcast state (TrafficSystem.snapshot() shape)"""
+        head = self.head
+        green = data.get('current_green_road')
+        timestamp = data.get('timestamp')
+        fields = [self.published + 1,
+                  datetime.fromisoformat(timestamp).timestamp() if timestamp else math.nan,
+                  NONE_CODE if green is None else _ROAD_INDEX[green],
+                  data.get('green_time_remaining') or 0]
+        queues = data['queues']
+        empty = self._empty
+        for lane in self.lanes:
+            queue = queues.get(lane) or {'size': 0, 'vehicles': []}
+            vehicles = queue['vehicles'][:head]
+            fields += (_LANE_INDEX[lane], len(vehicles), queue['size'])
+            for vehicle in vehicles:
+                fields += (_vehicle_number(vehicle['id']), _LANE_INDEX[vehicle['lane']],
+                           _DEST_INDEX[vehicle['destination']])
+            fields += empty[:3 * (head - len(vehicles))]
+        self.body.pack_into(self._staging, 0, *fields)
+
+        buf = self.buf
+        self.seq += 1                   # Odd: update in progress
+        _SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+        buf[BODY_OFFSET:BODY_OFFSET + self.body.size] = self._staging
+        self.seq += 1                   # Even: consistent
+        _SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+        self.published += 1
+
+    def close(self):
+        """Detach and remove the block (readers keep their mapping until they close)"""
+        self.buf = None
+        self.shm.close()
+        _written.discard(self.name)
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedStateReader:
+    """One of any number of readers of a SharedStateWriter's block"""
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, version, lane_count, head, _, _ = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"shared memory {name!r} is not a traffic state block")
+        if version != SHM_VERSION:
+            self.close()
+            raise ValueError(f"unsupported shared state version {version}")
+        self.head = head
+        self.lane_count = lane_count
+        self.body = body_struct(lane_count, head)
+        self.last_seq = 0
+        self.retries = 0
+
+    def read_raw(self):
+        """(seq, body bytes) of the newest consistent state, or None if none is published yet"""
+        buf = self.buf
+        end = BODY_OFFSET + self.body.size
+        for _ in range(READ_RETRIES):
+            before = _SEQ.unpack_from(buf, SEQ_OFFSET)[0]
+            if before & 1:
+                self.retries += 1
+                continue
+            body = bytes(buf[BODY_OFFSET:end])
+            if _SEQ.unpack_from(buf, SEQ_OFFSET)[0] == before:
+                return (before, body) if before else None
+            self.retries += 1
+        return None
+
+    def read(self):
+        """The newest state as a keyframe message if it changed since the last read, else None"""
+        raw = self.read_raw()
+        if raw is None or raw[0] == self.last_seq:
+            return None
+        self.last_seq, body = raw
+        values = self.body.unpack(body)
+        seq, timestamp, road, green_time = values[:4]
+        queues = {}
+        head = self.head
+        position = 4
+        for _ in range(self.lane_count):
+            lane, count, size = values[position:position + 3]
+            position += 3
+            slots = values[position:position + 3 * count]
+            position += 3 * head
+            queues[LANE_CODES[lane]] = {
+                'size': size,
+                'vehicles': [{'id': _vehicle_id(number), 'lane': LANE_CODES[vehicle_lane],
+                              'destination': _DEST_CODES[destination]}
+                             for number, vehicle_lane, destination in zip(slots[0::3], slots[1::3], slots[2::3])],
+            }
+        return {
+            'type': 'keyframe',
+            'seq': seq,
+            'timestamp': None if math.isnan(timestamp) else datetime.fromtimestamp(timestamp).isoformat(),
+            'queues': queues,
+            'current_green_road': None if road == NONE_CODE else ROAD_CODES[road],
+            'green_time_remaining': green_time,
+        }
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+def _attach(name):
+    """Map an existing block without letting this process's resource tracker unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block; take this one back out,
+        # unless a writer in this process owns it and needs its registration
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        if shm.name not in _written:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _writer_running(pid):
+    if os.name == "nt":
+        # Windows frees a block with its last handle, so an existing one is in use
+        return True
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _check_stale(name):
+    """Raise FileExistsError unless block `name` is a traffic state block whose writer has exited"""
+    shm = _attach(name)
+    try:
+        header = bytes(shm.buf[:_HEADER.size]) if shm.size >= _HEADER.size else b""
+    finally:
+        shm.close()
+    if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise FileExistsError(f"shared memory {name!r} exists and is not a traffic state block; "
+                              f"use force=True (--shm-force) to replace it")
+    pid = _HEADER.unpack(header)[5]
+    if _writer_running(pid):
+        raise FileExistsError(f"shared memory {name!r} is in use by a running writer (pid {pid}); "
+                              f"use force=True (--shm-force) to replace it")
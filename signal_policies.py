@@ -0,0 +1,137 @@
+"""Signal-control policies for TrafficSystem.
+
+A policy decides which road gets the green light and for how many cycles.
+TrafficSystem calls `check_priority_condition(system)` after every change
+to the queues and `select_next_green_road(system)` whenever the current
+green phase runs out. Policies read queue sizes through
+`system.queues[lane].size()`, which is O(1). Policies keep no per-run
+state of their own (it lives on the system), so one instance can drive
+many TrafficSystems.
+"""
+
+ROADS = "ABCD"
+
+
+class SignalPolicy:
+    name = "base"
+
+    def check_priority_condition(self, system):
+        """Called after vehicles are added or served"""
+
+    def select_next_green_road(self, system):
+        """Return (road, green_time), or None to keep the current state"""
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class AL2PriorityPolicy(SignalPolicy):
+    """The original controller.
+
+    AL2 gets priority 10 in the lane priority queue above `priority_high`
+    vehicles and drops back to 0 below `priority_low`. The first non-empty
+    L2 lane in priority order gets green: a prioritised AL2 for
+    `size - priority_green_offset` cycles, otherwise for the average L2 queue
+    of the lanes without priority (times `green_time_scale`).
+    """
+    name = "al2-priority"
+
+    def check_priority_condition(self, system):
+        al2_size = system.queues["AL2"].size()
+        if al2_size > system.priority_high:
+            priority = 10
+        elif al2_size < system.priority_low:
+            priority = 0
+        else:
+            return
+        if system.events.info and system.lane_priority_queue.get_priority("AL2") != priority:
+            system.events.emit("priority_change", system.cycle, lane="AL2", priority=priority, size=al2_size)
+        system.lane_priority_queue.update_priority("AL2", priority)
+
+    def select_next_green_road(self, system):
+        lanes_to_serve = system.lane_priority_queue.get_all_lanes()
+        if not lanes_to_serve:
+            return None
+
+        next_lane = lanes_to_serve[0]
+        for lane_node in lanes_to_serve:
+            if not system.queues[lane_node.lane_name].is_empty():
+                next_lane = lane_node
+                break
+
+        green_time = system.green_time_remaining
+        if next_lane.lane_name == "AL2" and next_lane.priority > 0:
+            green_time = max(0, system.queues[next_lane.lane_name].size() - system.priority_green_offset)
+        else:
+            normal_lanes = [ln for ln in lanes_to_serve if ln.priority == 0]
+            if normal_lanes:
+                total_vehicles = sum(system.queues[ln.lane_name].size() for ln in normal_lanes)
+                green_time = int(total_vehicles / len(normal_lanes) * system.green_time_scale)
+        return next_lane.lane_name[0], green_time
+
+
+class LongestQueueFirstPolicy(SignalPolicy):
+    """Green for the road with the most queued vehicles, until its longest lane is empty"""
+    name = "longest-queue-first"
+
+    def select_next_green_road(self, system):
+        best_road, best_total, best_lane = None, 0, 0
+        for road in ROADS:
+            sizes = [system.queues[lane].size() for lane in system.road_lanes[road]]
+            total = sum(sizes)
+            if total > best_total:
+                best_road, best_total, best_lane = road, total, max(sizes)
+        if best_road is None:
+            return system.current_green_road or ROADS[0], 0
+        return best_road, best_lane
+
+
+class MaxPressurePolicy(SignalPolicy):
+    """Fixed-length phases given to the road with the highest pressure.
+
+    Pressure is the road's queued vehicles minus the load on the roads they
+    drive into. An isolated intersection has no downstream queues, so by
+    default downstream load is zero; pass `downstream(system, road)` to
+    account for it (e.g. in a road network).
+    """
+    name = "max-pressure"
+
+    def __init__(self, phase_length=3, downstream=None):
+        self.phase_length = phase_length
+        self.downstream = downstream
+
+    def select_next_green_road(self, system):
+        best_road, best_pressure = None, 0
+        for road in ROADS:
+            pressure = sum(system.queues[lane].size() for lane in system.road_lanes[road])
+            if self.downstream is not None:
+                pressure -= self.downstream(system, road)
+            if pressure > best_pressure:
+                best_road, best_pressure = road, pressure
+        if best_road is None:
+            return system.current_green_road or ROADS[0], 0
+        return best_road, self.phase_length
+
+    def __repr__(self):
+        return f"MaxPressurePolicy(phase_length={self.phase_length})"
+
+
+class FixedCyclePolicy(SignalPolicy):
+    """Roads A, B, C, D in turn, each green for a fixed number of cycles"""
+    name = "fixed-cycle"
+
+    def __init__(self, green_time=5):
+        self.green_time = green_time
+
+    def select_next_green_road(self, system):
+        current = system.current_green_road
+        road = ROADS[0] if current is None else ROADS[(ROADS.index(current) + 1) % len(ROADS)]
+        return road, self.green_time
+
+    def __repr__(self):
+        return f"FixedCyclePolicy(green_time={self.green_time})"
+
+
+POLICIES = {policy.name: policy for policy in
+            (AL2PriorityPolicy, LongestQueueFirstPolicy, MaxPressurePolicy, FixedCyclePolicy)}
@@ -0,0 +1,128 @@
+"""Simulated time for TrafficSystem.run, decoupled from wall time.
+
+Each cycle is `interval` seconds of simulated time. SimClock paces cycles
+at `speed` times real time (2 = twice as fast, 0 = free-running, as fast as
+the simulation goes) and the speed can be changed while a run is going.
+BroadcastThrottle caps how many states per second reach the socket server:
+a state is built and sent only when one is due, so it is always the latest
+state, and the cycles in between are never serialized at all.
+
+    python traffic_generator.py --speed 60 --max-rate 10 --cycles 0 --controls
+
+With --controls, lines typed on stdin steer the clock: `speed N`, `pause`,
+`resume` and `quit`.
+"""
+import sys
+import threading
+import time
+
+
+class SimClock:
+    """Counts simulated cycles and sleeps so they run at `speed` x real time"""
+    def __init__(self, interval, speed=1.0):
+        self.interval = interval
+        self.speed = max(0.0, speed)
+        self.cycles = 0
+        self.running = True
+        self.paused = threading.Event()
+        self.started = time.perf_counter()
+        self._deadline = None
+
+    @property
+    def sim_time(self):
+        """Simulated seconds elapsed"""
+        return self.cycles * self.interval
+
+    @property
+    def wall_time(self):
+        return time.perf_counter() - self.started
+
+    def set_speed(self, speed):
+        """Takes effect from the next cycle"""
+        self.speed = max(0.0, speed)
+
+    def pause(self):
+        self.paused.set()
+
+    def resume(self):
+        self.paused.clear()
+
+    def stop(self):
+        self.running = False
+        self.paused.clear()
+
+    def tick(self, on_pause=None):
+        """Count one cycle and wait until the next is due; `on_pause` runs once before a pause"""
+        self.cycles += 1
+        if self.paused.is_set():
+            if on_pause:
+                on_pause()
+            while self.paused.is_set():
+                time.sleep(0.05)
+            self._deadline = None
+        speed = self.speed
+        if speed <= 0 or self.interval <= 0:
+            self._deadline = None
+            return
+        now = time.perf_counter()
+        step = self.interval / speed
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += step
+        delay = self._deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -step:
+            # Fell behind (a slow cycle or speed change); don't burst to catch up
+            self._deadline = now
+
+
+class BroadcastThrottle:
+    """Lets at most `max_rate` broadcasts per second through (None = every cycle)"""
+    def __init__(self, max_rate=None):
+        self.max_rate = max_rate
+        self.sent = 0
+        self.skipped = 0
+        self.stale = False      # A state was skipped since the last broadcast
+        self._next = 0.0
+
+    def due(self):
+        """True if a broadcast may go out now; counts it as sent"""
+        if self.max_rate:
+            now = time.perf_counter()
+            if now < self._next:
+                self.skipped += 1
+                self.stale = True
+                return False
+            self._next = now + 1.0 / self.max_rate
+        self.sent += 1
+        self.stale = False
+        return True
+
+    def force(self):
+        """Count a broadcast sent regardless of the rate (e.g. the final state)"""
+        self.sent += 1
+        self.stale = False
+
+
+def read_controls(clock):
+    for line in sys.stdin:
+        command, _, argument = line.strip().partition(" ")
+        if command == "speed":
+            try:
+                clock.set_speed(float(argument))
+            except ValueError:
+                print(f"[CLOCK] bad argument for speed: {argument!r}")
+                continue
+        elif command == "pause":
+            clock.pause()
+        elif command == "resume":
+            clock.resume()
+        elif command == "quit":
+            clock.stop()
+            return
+        else:
+            print("[CLOCK] commands: speed N (0 = free-running), pause, resume, quit")
+            continue
+        print(f"[CLOCK] {command} {argument}".rstrip()
+              + f" (cycle {clock.cycles}, {clock.sim_time:.0f}s simulated in {clock.wall_time:.0f}s)")
@@ -1,20 +1,66 @@
-import pygame
+import argparse
+import os
 import sys
 
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+from car_store import ROADS, CarStore
 from client_socket import SocketClient
+from delta_protocol import DeltaDecoder
+from snapshot_buffer import Snapshot, SnapshotBuffer, diff_snapshots
 
-# Pygame setup
-pygame.init()
 WIDTH, HEIGHT = 1000, 800
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Traffic Simulator")
-clock = pygame.time.Clock()
 FPS = 60
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Set up by init_graphics(), so importing this module opens no window
+screen = None
+clock = None
+background = None
+backdrop = None
+car_sprites = None
+offscreen = False
 
-# Load images
-background = pygame.image.load("lanesystem.png").convert_alpha()
-car_img = pygame.image.load("car.png").convert_alpha()
-car_img = pygame.transform.scale(car_img, (30, 30))
+
+def init_graphics(headless=False):
+    """Open the window (or an offscreen surface when headless) and load the images"""
+    global screen, clock, background, backdrop, car_sprites, offscreen
+    if screen is not None:
+        return
+    offscreen = headless
+    if headless:
+        # Plain surface, no display: nothing is initialised but pygame's image
+        # loading, so this works on machines without a display
+        screen = pygame.Surface((WIDTH, HEIGHT))
+    else:
+        pygame.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Traffic Simulator")
+    clock = pygame.time.Clock()
+    
+    # Load images (convert() needs a display, so offscreen keeps the file format)
+    background = pygame.image.load(os.path.join(ASSET_DIR, "lanesystem.png"))
+    car_img = pygame.image.load(os.path.join(ASSET_DIR, "car.png"))
+    if not headless:
+        background = background.convert_alpha()
+        car_img = car_img.convert_alpha()
+    car_img = pygame.transform.scale(car_img, (30, 30))
+    
+    # Opaque full-window copy of the background: blits from it skip alpha
+    # blending, and the strip the image doesn't cover is restored to black too
+    backdrop = pygame.Surface((WIDTH, HEIGHT))
+    if not headless:
+        backdrop = backdrop.convert()
+    backdrop.fill((0, 0, 0))
+    backdrop.blit(background, (0, 0))
+    
+    # Car sprite for each road (in car_store.ROADS order), rotated once instead of every frame
+    car_sprites = [pygame.transform.rotate(car_img, angle) for angle in (0, 180, 90, 270)]
+
+
+# Above this many changed rectangles one full-window update is cheaper
+MAX_DIRTY_RECTS = 400
 
 # Lane rectangles
 lane_rects = {
@@ -37,161 +83,79 @@ STOP_LINES = {"A": 280, "B": 425, "C": 555, "D": 415}
 BLACK = (0, 0, 0)
 
 
-class Car:
-    def __init__(self, vehicle_data, position_in_queue):
-        self.id = vehicle_data['id']
-        self.lane = vehicle_data['lane']
-        self.destination = vehicle_data['destination']
-        self.road = self.lane[0]
-        rect = lane_rects[self.lane]
-        
-        # Calculate spacing: 35 pixels between cars
-        spacing = position_in_queue * 35
-        
-        if self.lane.startswith('A'):
-            self.x, self.y = rect.centerx - 15, rect.top + spacing
-            self.speed, self.horizontal, self.direction = 2, False, 1
-        elif self.lane.startswith('B'):
-            self.y = rect.bottom - spacing
-            self.x, self.y = rect.centerx - 15, self.y
-            self.speed, self.horizontal, self.direction = 2, False, -1
-        elif self.lane.startswith('C'):
-            self.x = rect.right - spacing
-            self.x, self.y = self.x, rect.centery - 15
-            self.speed, self.horizontal, self.direction = 2, True, -1
-        else:  # D
-            self.x, self.y = rect.left + spacing, rect.centery - 15
-            self.speed, self.horizontal, self.direction = 2, True, 1
-        
-        self.stopped = False
-        self.passed_intersection = False
-        self.turning = False
-    
-    def should_stop_at_red(self, light_state):
-        if self.passed_intersection or light_state != "red":
-            return False
-        
-        if self.road == "A":
-            return self.y < STOP_LINES["A"] and self.y > STOP_LINES["A"] - 50
-        elif self.road == "B":
-            return self.y > STOP_LINES["B"] and self.y < STOP_LINES["B"] + 50
-        elif self.road == "C":
-            return self.x > STOP_LINES["C"] and self.x < STOP_LINES["C"] + 50
-        elif self.road == "D":
-            return self.x < STOP_LINES["D"] and self.x > STOP_LINES["D"] - 50
-        return False
-    
-    def has_passed_intersection(self):
-        if self.road == "A":
-            return self.y > STOP_LINES["A"] + 50
-        elif self.road == "B":
-            return self.y < STOP_LINES["B"] - 50
-        elif self.road == "C":
-            return self.x < STOP_LINES["C"] - 50
-        elif self.road == "D":
-            return self.x > STOP_LINES["D"] + 50
-        return False
-    
-    def move(self, light_state):
-        if self.has_passed_intersection():
-            self.passed_intersection = True
-            if not self.turning and self.destination:
-                self._start_turning()
-        
-        if self.should_stop_at_red(light_state):
-            return
-        
-        if self.turning:
-            self._continue_turn()
-        else:
-            if self.horizontal:
-                self.x += self.speed * self.direction
-            else:
-                self.y += self.speed * self.direction
-    
-    def _start_turning(self):
-        self.turning = True
-        dest_rect = lane_rects.get(self.destination)
-        if dest_rect:
-            self.target_x = dest_rect.centerx - 15
-            self.target_y = dest_rect.centery - 15
-    
-    def _continue_turn(self):
-        if not hasattr(self, 'target_x'):
-            return
-        
-        dx = self.target_x - self.x
-        dy = self.target_y - self.y
-        dist = (dx**2 + dy**2)**0.5
-        
-        if dist < 3:
-            self.turning = False
-            self.lane = self.destination
-            if self.destination.startswith('A'):
-                self.horizontal, self.direction = False, 1
-            elif self.destination.startswith('B'):
-                self.horizontal, self.direction = False, -1
-            elif self.destination.startswith('C'):
-                self.horizontal, self.direction = True, -1
-            else:
-                self.horizontal, self.direction = True, 1
-        else:
-            self.x += (dx / dist) * self.speed
-            self.y += (dy / dist) * self.speed
-    
-    def is_off_screen(self):
-        return self.x < -100 or self.x > WIDTH + 100 or self.y < -100 or self.y > HEIGHT + 100
-    
-    def draw(self):
-        if self.road == "A":
-            img = pygame.transform.rotate(car_img, 0)
-        elif self.road == "B":
-            img = pygame.transform.rotate(car_img, 180)
-        elif self.road == "C":
-            img = pygame.transform.rotate(car_img, 90)
-        else:
-            img = pygame.transform.rotate(car_img, 270)
-        screen.blit(img, (int(self.x), int(self.y)))
-
-
 class TrafficSimulator:
-    def __init__(self):
+    def __init__(self, headless=False):
+        init_graphics(headless)
         self.socket_client = SocketClient()
         self.running = False
         self.traffic_data = None
-        self.cars = {}  # Dict: vehicle_id -> Car
+        self.cars = CarStore(lane_rects, STOP_LINES, WIDTH, HEIGHT)
         self.light_states = {"A": "red", "B": "red", "C": "red", "D": "red"}
+        # Network thread: decoder state is the back buffer, published as
+        # snapshots. Render loop: swaps in the newest one once per frame.
+        self.decoder = DeltaDecoder()
+        self.resync_requested = False
+        self.snapshots = SnapshotBuffer()
+        self.shown = None
+        # Dirty-rectangle rendering: what was drawn last frame
+        self.full_redraw = True
+        self.car_rects = []
+        self.drawn_lights = {}
     
     def update_from_data(self, data):
+        """Network thread: decode a message and publish the resulting state"""
         if not data:
             return
         
+        if self.decoder.apply(data) is None:
+            # Missed a delta; drop updates until the server sends a keyframe
+            if not self.resync_requested:
+                self.resync_requested = self.socket_client.request_keyframe()
+            return
+        self.resync_requested = False
+        self.snapshots.publish(Snapshot.from_decoder(self.decoder))
+    
+    def apply_latest_snapshot(self):
+        """Render loop: bring lights and cars up to the newest published state"""
+        snapshot = self.snapshots.take()
+        if snapshot is None:
+            return
+        
         # Update lights
-        current_green = data.get('current_green_road', None)
         for road in self.light_states:
-            self.light_states[road] = "green" if road == current_green else "red"
-        
-        # Update cars from queue data
-        queues = data.get('queues', {})
-        new_cars = {}
-        
-        for lane, queue_data in queues.items():
-            vehicles = queue_data.get('vehicles', [])
-            for idx, vehicle in enumerate(vehicles):
-                v_id = vehicle['id']
-                if v_id in self.cars:
-                    new_cars[v_id] = self.cars[v_id]
-                else:
-                    new_cars[v_id] = Car(vehicle, idx)
+            self.light_states[road] = "green" if road == snapshot.current_green_road else "red"
         
-        self.cars = new_cars
+        # Apply only the vehicles that left or joined a queue since the
+        # last snapshot shown, however many messages arrived in between
+        removed, added = diff_snapshots(self.shown, snapshot)
+        self.cars.remove(removed)
+        for vehicle, idx in added:
+            self.cars.add(vehicle, idx)
+        self.shown = snapshot
     
     def draw(self):
-        screen.blit(background, (0, 0))
+        """Redraw only what cars and lights covered last frame and this frame"""
+        dirty = []
+        if self.full_redraw:
+            screen.blit(backdrop, (0, 0))
+        else:
+            # Erase last frame's cars
+            for rect in self.car_rects:
+                screen.blit(backdrop, rect, rect)
+            dirty.extend(self.car_rects)
+        
+        # Uncover lights that changed since last frame
+        for road, lights in light_rects.items():
+            state = self.light_states.get(road, "red")
+            if self.drawn_lights.get(road) != state:
+                for rect in lights.values():
+                    screen.blit(backdrop, rect, rect)
+                    dirty.append(rect)
+                self.drawn_lights[road] = state
         
         # Draw cars
-        for car in self.cars.values():
-            car.draw()
+        car_rects = screen.blits([(car_sprites[road], (x, y)) for road, x, y in self.cars.sprites()])
+        dirty.extend(car_rects)
         
         # Cover lights with black
         for road, lights in light_rects.items():
@@ -201,43 +165,133 @@ class TrafficSimulator:
             else:
                 pygame.draw.rect(screen, BLACK, lights["GREEN"])
         
-        pygame.display.flip()
+        if offscreen:
+            # Nothing to present; the frame is in `screen` for export
+            self.full_redraw = False
+        elif self.full_redraw or len(dirty) > MAX_DIRTY_RECTS:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(dirty)
+        self.car_rects = car_rects
     
     def update(self):
-        # Move all cars
-        for car in list(self.cars.values()):
-            light_state = self.light_states.get(car.road, "red")
-            car.move(light_state)
-            
-            # Remove off-screen cars
-            if car.is_off_screen():
-                del self.cars[car.id]
+        self.apply_latest_snapshot()
+        
+        # Move all cars; off-screen cars are dropped by the store
+        green = [self.light_states.get(road) == "green" for road in ROADS]
+        self.cars.update(green)
     
-    def run(self):
-        if not self.socket_client.start(self.update_from_data):
-            return
+    def run(self, fps=FPS, on_frame=None, shared=None):
+        """Render frames from the live server; fps 0 renders as fast as possible
+
+        With a shm_transport.SharedStateReader as `shared`, the newest state is
+        read from shared memory once per frame instead of from the socket.
+        """
+        if shared is None:
+            if not self.socket_client.start(self.update_from_data):
+                return
+            connected = lambda: self.socket_client.running
+        else:
+            connected = lambda: True
         
         self.running = True
         print("\n[SIMULATOR] Running...\n")
+        frame = 0
         
         try:
-            while self.running:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        self.running = False
+            while self.running and connected():
+                if shared is not None:
+                    self.update_from_data(shared.read())
+                if not offscreen:
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
+                            self.running = False
                 
                 self.update()
                 self.draw()
-                clock.tick(FPS)
+                if on_frame:
+                    on_frame(screen, frame)
+                frame += 1
+                if fps:
+                    clock.tick(fps)
                 
         except KeyboardInterrupt:
             print("\n[STOPPED]")
         finally:
             self.socket_client.client.close()
             pygame.quit()
-            sys.exit()
+        return frame
+    
+    def render_trace(self, trace, frames_per_cycle=30, start=0, end=None, on_frame=None):
+        """Render a recorded trace (trace_file.TraceReader) with no frame cap; returns frames drawn"""
+        end = len(trace) if end is None else min(end, len(trace))
+        frame = 0
+        for index in range(trace.keyframe_before(start), end):
+            self.update_from_data(trace.message(index))
+            if index < start:
+                continue
+            for _ in range(frames_per_cycle):
+                self.update()
+                self.draw()
+                if on_frame:
+                    on_frame(screen, frame)
+                frame += 1
+        return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Traffic simulator display")
+    parser.add_argument("--headless", action="store_true",
+                        help="render to an offscreen surface with no window and no frame cap")
+    parser.add_argument("--trace", help="render this recorded trace instead of connecting to the server")
+    parser.add_argument("--start", type=int, default=0, help="first trace cycle to render")
+    parser.add_argument("--end", type=int, help="stop before this trace cycle")
+    parser.add_argument("--frames-per-cycle", type=int, default=30,
+                        help="frames rendered per trace cycle (30 = 0.5 s cycles at 60 FPS)")
+    parser.add_argument("--fps", type=int, help=f"frame cap for live rendering (default {FPS}, headless 0 = none)")
+    parser.add_argument("--frames-dir", help="save frames as images in this directory")
+    parser.add_argument("--every", type=int, default=1, help="export every Nth frame")
+    parser.add_argument("--thumbnail-width", type=int, help="scale exported frames to this width")
+    parser.add_argument("--format", choices=["png", "jpg"], default="png", help="image format for --frames-dir")
+    parser.add_argument("--raw", action="store_true", help="write raw RGB24 frames to stdout")
+    parser.add_argument("--shm", metavar="NAME",
+                        help="read states from the generator's shared memory block instead of the socket")
+    args = parser.parse_args()
+    
+    raw = None
+    if args.raw:
+        # Keep stdout for frame bytes only; messages go to stderr
+        raw = sys.stdout.buffer
+        sys.stdout = sys.stderr
+    
+    exporter = None
+    if args.frames_dir or raw:
+        from frame_export import FrameExporter
+        exporter = FrameExporter(args.frames_dir, every=args.every, width=args.thumbnail_width,
+                                 image_format=args.format, raw=raw)
+        print(f"[SIMULATOR] Exporting {exporter.describe(WIDTH, HEIGHT)}", file=sys.stderr)
+    
+    simulator = TrafficSimulator(headless=args.headless)
+    if args.trace:
+        from trace_file import TraceReader
+        trace = TraceReader(args.trace)
+        frames = simulator.render_trace(trace, args.frames_per_cycle, args.start, args.end, exporter)
+        trace.close()
+        simulator.socket_client.client.close()
+        print(f"[SIMULATOR] Rendered {frames} frames", file=sys.stderr)
+    else:
+        fps = args.fps if args.fps is not None else (0 if args.headless else FPS)
+        shared = None
+        if args.shm:
+            from shm_transport import SharedStateReader
+            shared = SharedStateReader(args.shm)
+        simulator.run(fps=fps, on_frame=exporter, shared=shared)
+        if shared:
+            shared.close()
+    if exporter:
+        exporter.close()
 
 
 if __name__ == "__main__":
-    simulator = TrafficSimulator()
-    simulator.run()
\ No newline at end of file
+    main()
@@ -0,0 +1,70 @@
+"""Hand the newest decoded state from the network thread to the render loop.
+
+The network thread decodes every message into its DeltaDecoder (the back
+buffer) and publishes an immutable Snapshot of the result. The render loop
+takes the newest one once per frame. Publishing and taking are single
+reference assignments, which are atomic under the GIL, so neither side ever
+waits on a lock. When several messages arrive within one frame, only the
+last snapshot is seen and the ones before it are skipped (coalesced).
+"""
+
+
+class Snapshot:
+    """Immutable view of one decoded state: lights plus each lane's vehicle window"""
+    __slots__ = ("seq", "current_green_road", "green_time_remaining", "queues")
+
+    def __init__(self, seq, current_green_road, green_time_remaining, queues):
+        self.seq = seq
+        self.current_green_road = current_green_road
+        self.green_time_remaining = green_time_remaining
+        self.queues = queues
+
+    @classmethod
+    def from_decoder(cls, decoder):
+        # Copy the windows: the decoder appends to its lists in place
+        queues = {lane: tuple(q['vehicles']) for lane, q in decoder.queues.items()}
+        return cls(decoder.seq, decoder.current_green_road, decoder.green_time_remaining, queues)
+
+
+def diff_snapshots(old, new):
+    """(removed_ids, [(vehicle, position_in_queue)]) taking `old` to `new`"""
+    old_ids = set()
+    if old is not None:
+        for vehicles in old.queues.values():
+            old_ids.update(v['id'] for v in vehicles)
+    new_ids = set()
+    added = []
+    for vehicles in new.queues.values():
+        for i, vehicle in enumerate(vehicles):
+            new_ids.add(vehicle['id'])
+            if vehicle['id'] not in old_ids:
+                added.append((vehicle, i))
+    return list(old_ids - new_ids), added
+
+
+class SnapshotBuffer:
+    """Single-writer, single-reader latest-value slot"""
+    def __init__(self):
+        self._latest = None
+        self._taken = None
+        self.published = 0
+        self.taken = 0
+
+    def publish(self, snapshot):
+        """Writer side: make `snapshot` the newest state"""
+        self._latest = snapshot
+        self.published += 1
+
+    def take(self):
+        """Reader side: the newest snapshot not taken yet, or None"""
+        latest = self._latest
+        if latest is self._taken:
+            return None
+        self._taken = latest
+        self.taken += 1
+        return latest
+
+    @property
+    def coalesced(self):
+        """Snapshots that were replaced before the reader saw them"""
+        return self.published - self.taken
@@ -0,0 +1,150 @@
+"""Per-client subscriptions for SocketServer and AsyncSocketServer.
+
+A client may send a subscribe message at any time after connecting:
+
+    {'type': 'subscribe', 'roads': 'A', 'head': 4, 'max_rate': 2}
+    {'type': 'subscribe', 'lanes': ['AL2', 'BL2']}
+
+`lanes` and/or `roads` pick the lanes it receives (default all), `head` how
+many vehicles from the front of each lane (default 12, the most the
+generator sends unless a subscriber asks for more, up to MAX_HEAD) and
+`max_rate` the most updates per second (default no limit). A client that
+never subscribes gets everything, as before.
+
+Clients with the same subscription share a group. Each broadcast state is
+filtered, delta-encoded and framed once per group that is due, and the
+same bytes go to every client in it; a resync or a new member only makes
+that group send a keyframe.
+"""
+import threading
+import time
+
+from delta_protocol import DeltaEncoder
+from wire_protocol import LANE_CODES, encode_frame
+
+HEAD_VEHICLES = 12
+MAX_HEAD = 64
+
+
+class Subscription:
+    """What a group of clients receives: lanes (None = all), head vehicles and max updates/s"""
+    __slots__ = ("lanes", "head", "max_rate")
+
+    def __init__(self, lanes=None, head=HEAD_VEHICLES, max_rate=None):
+        self.lanes = lanes
+        self.head = head
+        self.max_rate = max_rate
+
+    @classmethod
+    def from_message(cls, message):
+        """Validate a subscribe message; raises ValueError"""
+        lanes = None
+        if message.get('lanes') is not None or message.get('roads') is not None:
+            wanted = set(message.get('lanes') or ())
+            unknown = wanted - set(LANE_CODES)
+            if unknown:
+                raise ValueError(f"unknown lanes {sorted(unknown)}")
+            roads = message.get('roads') or ""
+            lanes = tuple(lane for lane in LANE_CODES if lane in wanted or lane[0] in roads)
+        head = message.get('head', HEAD_VEHICLES)
+        if not isinstance(head, int) or not 0 <= head <= MAX_HEAD:
+            raise ValueError(f"head must be 0-{MAX_HEAD}")
+        max_rate = message.get('max_rate') or None
+        if max_rate is not None and (not isinstance(max_rate, (int, float)) or max_rate < 0):
+            raise ValueError("max_rate must be a positive number")
+        return cls(lanes, head, max_rate)
+
+    @property
+    def key(self):
+        return self.lanes, self.head, self.max_rate
+
+    def filter(self, data):
+        """The part of a broadcast state this subscription receives"""
+        queues = data['queues']
+        head = self.head
+        if self.lanes is None and all(len(q['vehicles']) <= head for q in queues.values()):
+            return data
+        lanes = queues if self.lanes is None else [lane for lane in self.lanes if lane in queues]
+        return {
+            'timestamp': data.get('timestamp'),
+            'queues': {lane: {'size': queues[lane]['size'], 'vehicles': queues[lane]['vehicles'][:head]}
+                       for lane in lanes},
+            'current_green_road': data.get('current_green_road'),
+            'green_time_remaining': data.get('green_time_remaining'),
+        }
+
+    def __repr__(self):
+        return f"Subscription(lanes={self.lanes}, head={self.head}, max_rate={self.max_rate})"
+
+
+class SubscriptionGroup:
+    """Clients sharing one subscription, with their own delta encoder"""
+    def __init__(self, subscription):
+        self.subscription = subscription
+        self.encoder = DeltaEncoder()
+        self.clients = []
+        self.next_due = 0.0
+
+    def due(self, now):
+        max_rate = self.subscription.max_rate
+        if not max_rate:
+            return True
+        if now < self.next_due:
+            return False
+        self.next_due = now + 1.0 / max_rate
+        return True
+
+
+class SubscriptionRegistry:
+    """Which group each client is in; thread-safe for one broadcaster and many client handlers"""
+    def __init__(self):
+        self.groups = {}
+        self.client_groups = {}
+        self._lock = threading.Lock()
+
+    def join(self, client, subscription=None):
+        """Add a client (default subscription) or move it to a new subscription"""
+        subscription = subscription or Subscription()
+        with self._lock:
+            self._remove(client)
+            group = self.groups.get(subscription.key)
+            if group is None:
+                group = self.groups[subscription.key] = SubscriptionGroup(subscription)
+            group.clients.append(client)
+            # The newcomer needs a full state to diff against
+            group.encoder.request_keyframe()
+            self.client_groups[client] = group
+
+    def leave(self, client):
+        with self._lock:
+            self._remove(client)
+
+    def _remove(self, client):
+        group = self.client_groups.pop(client, None)
+        if group is None:
+            return
+        if client in group.clients:
+            group.clients.remove(client)
+        if not group.clients:
+            del self.groups[group.subscription.key]
+
+    def request_keyframe(self, client=None):
+        """Keyframe for one client's group, or for every group"""
+        with self._lock:
+            groups = [self.client_groups.get(client)] if client is not None else self.groups.values()
+            for group in groups:
+                if group is not None:
+                    group.encoder.request_keyframe()
+
+    @property
+    def head(self):
+        """Most head vehicles any subscriber wants"""
+        return max((key[1] for key in list(self.groups)), default=HEAD_VEHICLES)
+
+    def frames(self, data):
+        """[(frame, clients)] for every group due an update, each encoded once"""
+        now = time.perf_counter()
+        with self._lock:
+            due = [(group, group.clients[:]) for group in self.groups.values() if group.due(now)]
+        return [(encode_frame(group.encoder.encode(group.subscription.filter(data))), clients)
+                for group, clients in due]
@@ -0,0 +1,256 @@
+"""Parameter sweep over TrafficSystem policies, spread across all cores.
+
+Every combination of the given parameter values and seeds is run headless
+(no sockets, sleep or printing) in a pool of worker processes. Results are
+appended to a JSONL or CSV file as each run finishes; running the same
+command again skips runs already in the file, so an interrupted sweep
+resumes where it stopped.
+
+    python sweep.py --param arrival_rate=0.2,0.25,0.3 --param priority_high=8,10,12 \\
+        --seeds 0-9 --cycles 20000 --out sweep.jsonl
+    python sweep.py --grid grid.json --seeds 0-99 --out sweep.csv
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from multiprocessing.connection import wait
+
+from signal_policies import ROADS
+from traffic_generator import LANES, TrafficSystem
+
+# TrafficSystem keyword arguments a sweep may vary
+SWEEP_PARAMETERS = ("priority_arrival_rate", "arrival_rate", "priority_high", "priority_low",
+                    "priority_green_offset", "green_time_scale")
+
+
+def run_id(params, seed, cycles):
+    key = json.dumps({'params': params, 'seed': seed, 'cycles': cycles}, sort_keys=True)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def build_runs(grid, seeds, cycles):
+    names = sorted(grid)
+    runs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        for seed in seeds:
+            runs.append({'run_id': run_id(params, seed, cycles), 'params': params,
+                         'seed': seed, 'cycles': cycles})
+    return runs
+
+
+def run_config(run):
+    """Execute one run; this is what worker processes call"""
+    start = time.perf_counter()
+    system = TrafficSystem(seed=run['seed'], headless=True, **run['params'])
+    stats = system.run_headless(run['cycles'])
+    row = {'run_id': run['run_id'], 'seed': run['seed'], 'cycles': run['cycles']}
+    row.update(run['params'])
+    row['throughput'] = stats['throughput']
+    row['vehicles_generated'] = stats['vehicles_generated']
+    row['vehicles_served'] = stats['vehicles_served']
+    for lane, lane_stats in stats['lanes'].items():
+        row[f"{lane}_served"] = lane_stats['served']
+        row[f"{lane}_max_queue"] = lane_stats['max_queue']
+        row[f"{lane}_mean_queue"] = lane_stats['mean_queue']
+        row[f"{lane}_wait_p99"] = lane_stats['wait']['p99']
+    for road, count in stats['green_phases'].items():
+        row[f"green_{road}"] = count
+    row['seconds'] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def _worker(conn):
+    # Ctrl-C is handled by the parent, which stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        run = conn.recv()
+        if run is None:
+            break
+        try:
+            conn.send(run_config(run))
+        except Exception as e:
+            conn.send({'run_id': run['run_id'], 'error': repr(e)})
+    conn.close()
+
+
+def run_pool(runs, workers):
+    """Yield result rows in completion order.
+
+    Built on Process + Pipe rather than multiprocessing.Pool or
+    ProcessPoolExecutor: both import the stdlib `queue` module, which this
+    repo's queue.py shadows.
+    """
+    runs = iter(runs)
+    busy = {}
+    processes = []
+
+    def assign(conn):
+        run = next(runs, None)
+        if run is None:
+            conn.send(None)
+            return False
+        busy[conn] = run
+        conn.send(run)
+        return True
+
+    try:
+        for _ in range(workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            processes.append(process)
+            if not assign(parent):
+                break
+        while busy:
+            for conn in wait(list(busy)):
+                run = busy.pop(conn)
+                try:
+                    yield conn.recv()
+                except EOFError:
+                    yield {'run_id': run['run_id'], 'error': "worker process died"}
+                    continue
+                assign(conn)
+    finally:
+        for process in processes:
+            if busy:
+                process.terminate()
+            process.join()
+
+
+class ResultWriter:
+    """Appends rows to a .jsonl or .csv file and knows which run ids it holds"""
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.is_csv = path.endswith(".csv")
+        self.fieldnames = fieldnames
+        self.done = set()
+        self._load_existing()
+        self.file = open(path, "a", newline="")
+        self.csv = None
+        if self.is_csv:
+            self.csv = csv.DictWriter(self.file, fieldnames=fieldnames)
+            if not self.done and self.file.tell() == 0:
+                self.csv.writeheader()
+
+    def _load_existing(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            # Drop a partial last line left by an interrupted write
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+                data = data[:end]
+        lines = data.decode("utf-8").splitlines()
+        if self.is_csv:
+            rows = csv.DictReader(lines)
+            if rows.fieldnames and rows.fieldnames != self.fieldnames:
+                raise SystemExit(f"{self.path} has different columns; use a new output file")
+        else:
+            rows = (json.loads(line) for line in lines if line.strip())
+        self.done = {row['run_id'] for row in rows}
+
+    def write(self, row):
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+        self.done.add(row['run_id'])
+
+    def close(self):
+        self.file.close()
+
+
+def fieldnames_for(grid):
+    names = ['run_id', 'seed', 'cycles'] + sorted(grid)
+    names += ['throughput', 'vehicles_generated', 'vehicles_served']
+    for lane in LANES:
+        names += [f"{lane}_served", f"{lane}_max_queue", f"{lane}_mean_queue", f"{lane}_wait_p99"]
+    names += [f"green_{road}" for road in ROADS] + ['seconds']
+    return names
+
+
+def parse_seeds(text):
+    """'0-4,7' -> [0, 1, 2, 3, 4, 7]; the --seeds syntax of sweep.py and policy_eval.py"""
+    seeds = []
+    for part in text.split(","):
+        low, _, high = part.strip().partition("-")
+        try:
+            low, high = int(low), int(high or low)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad seed range {part!r} (expected e.g. 0-9,15)") from None
+        if high < low:
+            raise argparse.ArgumentTypeError(f"bad seed range {part!r}: {high} < {low}")
+        seeds.extend(range(low, high + 1))
+    return seeds
+
+
+def parse_grid(args):
+    grid = {}
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+    for item in args.param:
+        name, _, values = item.partition("=")
+        grid[name] = [json.loads(v) for v in values.split(",")]
+    unknown = set(grid) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise SystemExit(f"unknown parameters {sorted(unknown)}; choose from {', '.join(SWEEP_PARAMETERS)}")
+    for name, values in grid.items():
+        if not isinstance(values, list):
+            grid[name] = [values]
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--grid", help="JSON file mapping parameter names to lists of values")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2",
+                        help="values for one parameter (repeatable)")
+    parser.add_argument("--seeds", type=parse_seeds, default="0", help="seeds, e.g. 0-9 or 1,5,7")
+    parser.add_argument("--cycles", type=int, default=10000, help="cycles per run")
+    parser.add_argument("--out", required=True, help="results file (.jsonl or .csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    grid = parse_grid(args)
+    runs = build_runs(grid, args.seeds, args.cycles)
+    writer = ResultWriter(args.out, fieldnames_for(grid))
+    todo = [run for run in runs if run['run_id'] not in writer.done]
+    print(f"[SWEEP] {len(runs)} runs, {len(runs) - len(todo)} already done, "
+          f"{len(todo)} to go on {args.workers} workers")
+
+    start = time.perf_counter()
+    finished = failed = 0
+    try:
+        for row in run_pool(todo, args.workers):
+            if 'error' in row:
+                failed += 1
+                print(f"[SWEEP] run {row['run_id']} failed: {row['error']}", file=sys.stderr)
+                continue
+            writer.write(row)
+            finished += 1
+            if finished % 50 == 0 or finished == len(todo):
+                rate = finished / (time.perf_counter() - start) * 60
+                print(f"[SWEEP] {finished}/{len(todo)} runs ({rate:.0f}/min)")
+    except KeyboardInterrupt:
+        print(f"\n[SWEEP] Interrupted after {finished} runs; rerun the same command to resume")
+    finally:
+        writer.close()
+    if failed:
+        print(f"[SWEEP] {failed} runs failed and will be retried on the next invocation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from batch_simulator import BatchTrafficSimulator
+from signal_policies import ROADS
+from traffic_generator import DESTINATIONS, LANES, TrafficSystem
+
+
+class MaskArrivals:
+    """ArrivalGenerator stand-in that replays a (cycles, lanes) bool mask"""
+    def __init__(self, mask):
+        self.mask = mask
+
+    def arrivals(self, cycle):
+        return [(LANES[j], DESTINATIONS[LANES[j]][0]) for j in np.flatnonzero(self.mask[cycle - 1])]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_traffic_system_cycle_by_cycle(seed):
+    cycles = 3000
+    rates = np.array([0.7 if lane == "AL2" else 0.3 for lane in LANES])
+    mask = np.random.default_rng(seed).random((cycles, len(LANES))) < rates
+
+    system = TrafficSystem(seed=seed, headless=True, arrivals=MaskArrivals(mask))
+    batch = BatchTrafficSimulator(1, seed=seed)
+    for cycle in range(cycles):
+        system.step()
+        batch.step(mask[cycle][None, :])
+        sizes = [system.queues[lane].size() for lane in LANES]
+        assert sizes == batch.sizes[0].tolist(), f"queue sizes differ at cycle {cycle + 1}"
+        green = batch.green[0]
+        assert system.current_green_road == (ROADS[green] if green >= 0 else None), \
+            f"green road differs at cycle {cycle + 1}"
+
+    served = [system.queues[lane].total_vehicles_processed for lane in LANES]
+    assert served == batch.served[0].tolist()
+
+
+def test_intersections_are_independent():
+    cycles = 500
+    rates = np.array([0.7 if lane == "AL2" else 0.3 for lane in LANES])
+    masks = np.random.default_rng(5).random((cycles, 3, len(LANES))) < rates
+
+    batch = BatchTrafficSimulator(3)
+    singles = [BatchTrafficSimulator(1) for _ in range(3)]
+    for cycle in range(cycles):
+        batch.step(masks[cycle])
+        for i, single in enumerate(singles):
+            single.step(masks[cycle, i][None, :])
+    for i, single in enumerate(singles):
+        assert batch.sizes[i].tolist() == single.sizes[0].tolist()
+        assert batch.wait_hist[i].tolist() == single.wait_hist[0].tolist()
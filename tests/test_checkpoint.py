@@ -0,0 +1,82 @@
+import pytest
+
+import checkpoint
+from arrivals import ArrivalGenerator
+from signal_policies import FixedCyclePolicy, MaxPressurePolicy
+from traffic_generator import TrafficSystem
+
+
+def make_system(mode, seed, policy=None):
+    system = TrafficSystem(seed=seed, headless=True, policy=policy)
+    if mode != "per_lane":
+        system.arrivals = ArrivalGenerator.for_system(system, model=mode)
+    return system
+
+
+def state_of(system):
+    """Everything the next cycle depends on that does not involve wall-clock time"""
+    snapshot = system.snapshot()
+    del snapshot['timestamp']
+    return {
+        'cycle': system.cycle,
+        'vehicle_counter': system.vehicle_counter,
+        'queues': {lane: ([(v.id, v.destination, v.enqueue_cycle) for v in q.get_all_vehicles()],
+                          q.total_vehicles_processed)
+                   for lane, q in system.queues.items()},
+        'lane_heap': [(node.lane_name, node.priority, node.order)
+                      for node in system.lane_priority_queue.queue],
+        'rng': system.rng.getstate(),
+        'arrivals_rng': system.arrivals.rng.bit_generator.state if system.arrivals is not None else None,
+        'wait_cycles': {lane: (h.counts, h.count, h.total, h.min, h.max)
+                        for lane, h in system.wait_cycles.items()},
+        'wait_ns_count': {lane: h.count for lane, h in system.wait_ns.items()},
+        'green_phase_counts': dict(system.green_phase_counts),
+        'snapshot': snapshot,
+    }
+
+
+def check_resume(tmp_path, build):
+    """Checkpoint build(3) after 3000 cycles, restore into build(99), run 3000 more, compare"""
+    # The restored half crosses into a new 4096-cycle arrivals block
+    before, after = 3000, 3000
+
+    uninterrupted = build(3)
+    uninterrupted.run_headless(before + after)
+
+    original = build(3)
+    original.run_headless(before)
+    path = str(tmp_path / "run.ckpt")
+    checkpoint.save(original, path)
+    restored = checkpoint.restore(build(99), checkpoint.load(path))
+    assert state_of(restored) == state_of(original)
+
+    restored.run_headless(after)
+    assert state_of(restored) == state_of(uninterrupted)
+
+
+@pytest.mark.parametrize("mode", ["per_lane", "bernoulli", "poisson"])
+def test_restored_run_matches_uninterrupted_run(mode, tmp_path):
+    check_resume(tmp_path, lambda seed: make_system(mode, seed))
+
+
+# Policies keep no per-run state, so one instance can drive every system
+@pytest.mark.parametrize("policy", [MaxPressurePolicy(phase_length=4), FixedCyclePolicy(7)], ids=repr)
+def test_restored_run_keeps_its_policy(policy, tmp_path):
+    check_resume(tmp_path, lambda seed: make_system("per_lane", seed, policy))
+
+
+def test_restore_rejects_other_arrivals_mode(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    checkpoint.save(make_system("bernoulli", seed=1), path)
+    with pytest.raises(checkpoint.CheckpointError):
+        checkpoint.restore(make_system("per_lane", seed=1), checkpoint.load(path))
+
+
+def test_restore_rejects_other_policy(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    checkpoint.save(make_system("per_lane", seed=1, policy=MaxPressurePolicy()), path)
+    state = checkpoint.load(path)
+    with pytest.raises(checkpoint.CheckpointError, match="MaxPressurePolicy"):
+        checkpoint.restore(make_system("per_lane", seed=1), state)
+    with pytest.raises(checkpoint.CheckpointError):
+        checkpoint.restore(make_system("per_lane", seed=1, policy=MaxPressurePolicy(phase_length=5)), state)
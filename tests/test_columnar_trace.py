@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from columnar_trace import ColumnarTrace, ColumnarTraceWriter
+from traffic_generator import TrafficSystem
+
+
+def write_run(directory, cycles, chunk_rows=256, **kwargs):
+    system = TrafficSystem(seed=4, headless=True)
+    system.columns = ColumnarTraceWriter(directory, system.lanes, chunk_rows, **kwargs)
+    system.run_headless(cycles)
+    system.columns.close(system)
+    return system
+
+
+def test_round_trip(tmp_path):
+    directory = str(tmp_path / "run.columns")
+    system = write_run(directory, 1000)
+    trace = ColumnarTrace(directory)
+    assert trace.rows("cycle") == 1000
+    assert trace.rows("serve_cycle") == system.vehicle_counter
+    last_sizes = list(trace.chunks("lane_sizes"))[-1][0][-1]
+    assert last_sizes.tolist() == [system.queues[lane].size() for lane in trace.lanes]
+
+
+def test_refuses_non_empty_directory(tmp_path):
+    (tmp_path / "notes.txt").write_text("keep me")
+    with pytest.raises(FileExistsError):
+        ColumnarTraceWriter(str(tmp_path), TrafficSystem(headless=True).lanes)
+    assert os.listdir(tmp_path) == ["notes.txt"]
+
+
+def test_overwrite_replaces_only_trace_files(tmp_path):
+    directory = str(tmp_path)
+    write_run(directory, 1000)
+    (tmp_path / "notes.txt").write_text("keep me")
+    (tmp_path / "other.000000.npy").write_bytes(b"not ours")
+
+    write_run(directory, 300, overwrite=True)
+    assert ColumnarTrace(directory).rows("cycle") == 300
+    assert (tmp_path / "notes.txt").read_text() == "keep me"
+    assert (tmp_path / "other.000000.npy").read_bytes() == b"not ours"
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from queue import LaneNode, LanePriorityQueue, VehicleQueue
+
+
+class SortedListQueue:
+    """Reference: the list-based lane queue, stable-sorted on every change"""
+    def __init__(self):
+        self.queue = []
+
+    def enqueue(self, lane_node):
+        self.queue.append(lane_node)
+        self.queue.sort(key=lambda x: x.priority, reverse=True)
+
+    def dequeue(self):
+        return self.queue.pop(0) if self.queue else None
+
+    def update_priority(self, lane_name, new_priority):
+        for node in self.queue:
+            if node.lane_name == lane_name:
+                node.priority = new_priority
+                self.queue.sort(key=lambda x: x.priority, reverse=True)
+                return True
+        return False
+
+    def get_all_lanes(self):
+        return list(self.queue)
+
+
+def names(nodes):
+    return [(node.lane_name, node.priority) for node in nodes]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_sorted_list_under_priority_churn(seed):
+    rng = random.Random(seed)
+    heap, reference = LanePriorityQueue(), SortedListQueue()
+    lanes = [f"L{i}" for i in range(12)]
+    queued = []
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.1 and len(queued) < len(lanes):
+            lane = rng.choice([lane for lane in lanes if lane not in queued])
+            priority = rng.randrange(4)
+            heap.enqueue(LaneNode(lane, priority))
+            reference.enqueue(LaneNode(lane, priority))
+            queued.append(lane)
+        elif action < 0.15 and queued:
+            top = heap.dequeue()
+            assert top.lane_name == reference.dequeue().lane_name, f"dequeue differs at step {step}"
+            queued.remove(top.lane_name)
+        elif queued:
+            lane, priority = rng.choice(queued), rng.randrange(4)
+            assert heap.update_priority(lane, priority) == reference.update_priority(lane, priority)
+        assert names(heap.get_all_lanes()) == names(reference.get_all_lanes()), f"order differs at step {step}"
+        if queued:
+            assert heap.peek().lane_name == reference.get_all_lanes()[0].lane_name
+
+
+def test_vehicle_queue_wraps_and_grows_in_fifo_order():
+    queue = VehicleQueue("AL2")
+    expected = []
+    for i in range(100):
+        for j in range(3):
+            queue.enqueue(i * 3 + j)
+            expected.append(i * 3 + j)
+        assert queue.dequeue() == expected.pop(0)
+        assert queue.peek(5) == expected[:5]
+    assert queue.get_all_vehicles() == expected
+    assert queue.total_vehicles_processed == 100
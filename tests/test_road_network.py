@@ -0,0 +1,18 @@
+from road_network import RoadNetwork, run_partitioned
+
+
+def test_vehicle_ids_are_unique_within_each_intersection():
+    network = RoadNetwork(3, 3, seed=4, arrivals="all")
+    for _ in range(300):
+        network.step()
+        for system in network.intersections.values():
+            ids = [vehicle.id for queue in system.queues.values() for vehicle in queue.get_all_vehicles()]
+            assert len(ids) == len(set(ids))
+    assert network.received
+
+
+def test_partitioned_run_matches_single_process():
+    single = RoadNetwork(4, 3, seed=2).run(150)
+    partitioned = run_partitioned(4, 3, 150, workers=2, seed=2)
+    partitioned.pop('seconds')
+    assert partitioned == {**single, 'crossed_partitions': partitioned['crossed_partitions']}
@@ -0,0 +1,79 @@
+import os
+import struct
+import subprocess
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import pytest
+
+from shm_transport import SharedStateReader, SharedStateWriter
+from traffic_generator import TrafficSystem
+
+
+@pytest.fixture
+def name(request):
+    return f"test_shm_{os.getpid()}_{request.node.name}".replace("[", "_").replace("]", "")
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_reader_sees_published_state(name):
+    system = TrafficSystem(seed=2, headless=True)
+    system.run_headless(200)
+    writer = SharedStateWriter(name, system.lanes)
+    try:
+        writer.publish(system.snapshot())
+        reader = SharedStateReader(name)
+        message = reader.read()
+        reader.close()
+    finally:
+        writer.close()
+    snapshot = system.snapshot()
+    assert message['current_green_road'] == snapshot['current_green_road']
+    assert message['queues'] == snapshot['queues']
+
+
+def test_live_block_is_refused(name):
+    writer = SharedStateWriter(name)
+    try:
+        with pytest.raises(FileExistsError, match="running writer"):
+            SharedStateWriter(name)
+        writer.publish({'queues': {}})
+        # The refused writer must not have touched the live block
+        reader = SharedStateReader(name)
+        assert reader.read_raw()[0] == 2
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_force_replaces_live_block(name):
+    writer = SharedStateWriter(name)
+    replacement = SharedStateWriter(name, force=True)
+    writer.shm.close()
+    replacement.close()
+
+
+def test_stale_block_is_replaced(name):
+    crashed = SharedStateWriter(name)
+    struct.pack_into("<I", crashed.buf, 12, dead_pid())
+    crashed.buf = None
+    crashed.shm.close()     # Crashed: never unlinked
+    writer = SharedStateWriter(name)
+    writer.close()
+
+
+def test_foreign_block_is_refused(name):
+    foreign = shared_memory.SharedMemory(name=name, create=True, size=64)
+    try:
+        with pytest.raises(FileExistsError, match="not a traffic state block"):
+            SharedStateWriter(name)
+    finally:
+        # Checking the block dropped this process's registration of it
+        resource_tracker.register(foreign._name, "shared_memory")
+        foreign.close()
+        foreign.unlink()
@@ -0,0 +1,69 @@
+import pytest
+
+from policy_eval import compare
+from signal_policies import POLICIES, AL2PriorityPolicy
+from traffic_generator import TrafficSystem
+
+# (cycle, road, green time) of every phase the original controller (before
+# signal_policies.py, with the global random seeded to 7) chose in 1000
+# cycles, and its lane sizes and vehicle count at the end
+ORIGINAL_PHASES_SEED_7 = [
+    (1, 'A', 0), (2, 'A', 1), (3, 'A', 1), (4, 'A', 1), (5, 'A', 1), (6, 'A', 2), (8, 'A', 2), (10, 'A', 3),
+    (13, 'A', 3), (16, 'A', 4), (20, 'A', 5), (25, 'B', 5), (30, 'A', 6), (36, 'A', 7), (43, 'A', 8),
+    (51, 'A', 9), (60, 'A', 12), (72, 'B', 14), (86, 'A', 17), (103, 'A', 20), (123, 'A', 24), (147, 'A', 29),
+    (176, 'A', 36), (212, 'B', 46), (258, 'A', 28), (286, 'A', 22), (308, 'A', 15), (323, 'A', 14),
+    (337, 'A', 13), (350, 'A', 7), (357, 'A', 5), (362, 'A', 4), (366, 'A', 3), (369, 'A', 2), (371, 'A', 2),
+    (373, 'A', 74), (447, 'A', 90), (537, 'A', 112), (649, 'A', 138), (787, 'A', 169), (956, 'A', 205),
+]
+ORIGINAL_SIZES_SEED_7 = [0, 0, 264, 235, 298, 314, 297, 313]
+ORIGINAL_VEHICLES_SEED_7 = 2842
+
+
+class RecordingPolicy(AL2PriorityPolicy):
+    def __init__(self):
+        self.phases = []
+
+    def select_next_green_road(self, system):
+        choice = super().select_next_green_road(system)
+        if choice is not None:
+            self.phases.append((system.cycle, *choice))
+        return choice
+
+
+def test_al2_priority_reproduces_original_controller():
+    policy = RecordingPolicy()
+    system = TrafficSystem(seed=7, headless=True, policy=policy)
+    for _ in range(1000):
+        system.step()
+    assert policy.phases == ORIGINAL_PHASES_SEED_7
+    assert [system.queues[lane].size() for lane in system.lanes] == ORIGINAL_SIZES_SEED_7
+    assert system.vehicle_counter == ORIGINAL_VEHICLES_SEED_7
+
+
+def arrival_stream(policy, seed, cycles):
+    """Every vehicle of a run, served or still queued, in arrival order"""
+    system = TrafficSystem(seed=seed, headless=True, policy=policy)
+    vehicles = []
+    for _ in range(cycles):
+        vehicles += system.step()
+    for lane in system.lanes:
+        vehicles += system.queues[lane].get_all_vehicles()
+    vehicles.sort(key=lambda v: int(v.id[1:]))
+    return [(v.id, v.lane, v.destination, v.enqueue_cycle) for v in vehicles]
+
+
+@pytest.mark.parametrize("seed", [0, 11])
+def test_every_policy_sees_the_same_arrivals(seed):
+    streams = {name: arrival_stream(policy(), seed, 1500) for name, policy in POLICIES.items()}
+    reference = streams.pop(AL2PriorityPolicy.name)
+    assert len(reference) > 1000
+    for name, stream in streams.items():
+        assert stream == reference, f"{name} saw different arrivals"
+
+
+def test_compare_accounts_for_the_same_vehicles():
+    seeds, cycles = [0, 1], 800
+    results = compare([policy() for policy in POLICIES.values()], seeds, cycles)
+    generated = {name: round(r['throughput'] * len(seeds) * cycles + r['queued_at_end'] * len(seeds))
+                 for name, r in results.items()}
+    assert len(set(generated.values())) == 1, generated
@@ -0,0 +1,28 @@
+import argparse
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+from sweep import parse_seeds
+
+
+def test_parse_seeds():
+    assert parse_seeds("0-4,7") == [0, 1, 2, 3, 4, 7]
+    assert parse_seeds(" 3 ") == [3]
+
+
+@pytest.mark.parametrize("text", ["3-1", "x", "1-x"])
+def test_parse_seeds_rejects_bad_ranges(text):
+    with pytest.raises(argparse.ArgumentTypeError, match="bad seed range"):
+        parse_seeds(text)
+
+
+@pytest.mark.parametrize("script", ["sweep.py", "policy_eval.py"])
+def test_bad_seeds_message_reaches_the_command_line(script):
+    result = subprocess.run([sys.executable, os.path.join(ROOT, script), "--seeds", "3-1"],
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "bad seed range '3-1': 1 < 3" in result.stderr
@@ -0,0 +1,65 @@
+import random
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+from columnar_trace import ColumnarTrace, ColumnarTraceWriter
+from latency_histogram import LatencyHistogram
+from trace_analysis import _bucket_indices, wait_percentiles
+from traffic_generator import LANES
+
+
+class EmptyQueue:
+    def size(self):
+        return 0
+
+    def get_all_vehicles(self):
+        return []
+
+
+def test_bucket_indices_match_record():
+    rng = random.Random(1)
+    values = list(range(300)) + [(1 << k) + d for k in range(7, 50) for d in (-1, 0, 1)]
+    values += [rng.randrange(1 << 40) for _ in range(2000)]
+    indices = _bucket_indices(np.array(values, dtype=np.int64), 7)
+    for value, index in zip(values, indices.tolist()):
+        histogram = LatencyHistogram()
+        histogram.record(value)
+        assert histogram.counts[index] == 1, value
+
+
+def test_long_waits_use_bounded_memory(tmp_path):
+    # Starved lanes wait for most of a very long run; a dense per-wait count
+    # array would need lanes x 40M entries here
+    rng = random.Random(2)
+    directory = str(tmp_path / "long.columns")
+    writer = ColumnarTraceWriter(directory, LANES, chunk_rows=4096)
+    system = SimpleNamespace(cycle=0, current_green_road=None, queues={lane: EmptyQueue() for lane in LANES})
+    expected = {lane: LatencyHistogram() for lane in LANES}
+    for cycle in range(1, 5001):
+        system.cycle = cycle
+        served = []
+        for lane in rng.sample(LANES, 3):
+            wait = rng.randrange(40_000_000) if lane[0] in "CD" else rng.randrange(50)
+            served.append(SimpleNamespace(lane=lane, enqueue_cycle=cycle, serve_cycle=cycle + wait))
+            expected[lane].record(wait)
+        writer.record(system, served)
+    writer.close(system)
+
+    tracemalloc.start()
+    try:
+        result = wait_percentiles(ColumnarTrace(directory))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 16 * 1024 * 1024
+
+    combined = LatencyHistogram()
+    for lane in LANES:
+        combined.merge(expected[lane])
+        assert {key: result[lane][key] for key in ('count', 'p50', 'p95', 'p99', 'max')} == \
+            {key: value for key, value in expected[lane].summary().items() if key != 'mean'}
+        assert result[lane]['mean'] == round(expected[lane].mean(), 3)
+    assert result['all']['p99'] == combined.percentile(99)
+    assert result['all']['max'] >= 30_000_000
@@ -0,0 +1,51 @@
+import socket
+
+import pytest
+
+from trace_file import TraceError, TraceReader, TraceWriter
+from traffic_generator import TrafficSystem
+from wire_protocol import (FRAME_HEADER, HEADER_SIZE, MAX_FRAME_SIZE, VERSION, BINARY_CODEC, FrameReader,
+                           ProtocolError, encode_frame)
+
+
+def test_frame_reader_round_trip():
+    ours, theirs = socket.socketpair()
+    message = {'type': 'subscribe', 'roads': 'A', 'head': 4}
+    theirs.sendall(encode_frame(message))
+    theirs.close()
+    reader = FrameReader(ours, size=16)
+    assert reader.read_message() == message
+    assert reader.read_message() is None
+    ours.close()
+
+
+def test_frame_reader_rejects_oversized_header():
+    ours, theirs = socket.socketpair()
+    theirs.sendall(FRAME_HEADER.pack(VERSION, BINARY_CODEC, MAX_FRAME_SIZE + 1))
+    reader = FrameReader(ours)
+    with pytest.raises(ProtocolError):
+        reader.read_message()
+    # Nothing was allocated for the claimed payload
+    assert len(reader.buffer) < MAX_FRAME_SIZE
+    ours.close()
+    theirs.close()
+
+
+def test_trace_reader_rejects_oversized_header(tmp_path):
+    path = str(tmp_path / "run.trace")
+    system = TrafficSystem(seed=1, headless=True)
+    writer = TraceWriter(path)
+    for _ in range(20):
+        system.step()
+        writer.write(system.snapshot())
+    writer.close()
+    trace = TraceReader(path)
+    assert len(trace) == 20
+    second = trace.offsets[1]
+    trace.close()
+
+    with open(path, "r+b") as f:
+        f.seek(second)
+        f.write(FRAME_HEADER.pack(VERSION, BINARY_CODEC, 0xFFFFFFFF)[:HEADER_SIZE])
+    with pytest.raises(TraceError):
+        TraceReader(path)
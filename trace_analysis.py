@@ -0,0 +1,218 @@
+"""Offline statistics over columnar traces (columnar_trace.py; needs NumPy).
+
+Each statistic is one pass over the trace's chunk files: a chunk is
+memory-mapped, reduced to a few per-lane or per-road counters and dropped
+before the next one is read, so memory stays at about one chunk however
+long the run was (a 100M-cycle trace is ~5 GB on disk). Waits go into
+per-lane LatencyHistograms, whose log buckets keep memory at a few
+thousand counters however long the longest wait; means and maxima stay
+exact and percentiles are within 2% as in the live statistics.
+
+    throughput         vehicles served per cycle, overall and per lane
+    lane_utilization   mean and max queue, share of cycles with a queue, and
+                       share of its road's green cycles in which the lane served
+    green_efficiency   per road: green cycles, vehicles served against the
+                       one-per-lane-per-cycle capacity, green cycles wasted on
+                       empty lanes
+    wait_percentiles   served vehicles' waits in cycles (count, mean, p50, p95,
+                       p99, max) and vehicles still queued at the end
+
+    python trace_analysis.py run.columns
+    python trace_analysis.py run.columns --json
+"""
+import argparse
+import json
+
+import numpy as np
+
+from columnar_trace import ColumnarTrace
+from latency_histogram import LatencyHistogram
+
+PERCENTILES = (50, 95, 99)
+
+
+class CycleTotals:
+    """Per-lane and per-road sums from one pass over the per-cycle columns"""
+    def __init__(self, trace):
+        lanes = len(trace.lanes)
+        roads = len(trace.roads)
+        self.cycles = 0
+        self.first_cycle = None
+        self.last_cycle = None
+        self.served = np.zeros(lanes, dtype=np.int64)
+        self.size_total = np.zeros(lanes, dtype=np.int64)
+        self.size_max = np.zeros(lanes, dtype=np.int64)
+        self.busy = np.zeros(lanes, dtype=np.int64)
+        self.green_cycles = np.zeros(roads, dtype=np.int64)
+        self.idle_green = np.zeros(roads, dtype=np.int64)
+        for cycle, sizes, green, served in trace.chunks("cycle", "lane_sizes", "green", "served"):
+            if not len(cycle):
+                continue
+            if self.first_cycle is None:
+                self.first_cycle = int(cycle[0])
+            self.last_cycle = int(cycle[-1])
+            self.cycles += len(cycle)
+            self.served += served.sum(axis=0, dtype=np.int64)
+            self.size_total += sizes.sum(axis=0, dtype=np.int64)
+            np.maximum(self.size_max, sizes.max(axis=0), out=self.size_max)
+            self.busy += np.count_nonzero(sizes, axis=0)
+            # Road index + 1 so that -1 (no green) lands in bin 0
+            green = np.asarray(green, dtype=np.int64) + 1
+            self.green_cycles += np.bincount(green, minlength=roads + 1)[1:]
+            idle = ~served.any(axis=1)
+            self.idle_green += np.bincount(green[idle], minlength=roads + 1)[1:]
+
+
+def _totals(trace, totals):
+    return totals if totals is not None else CycleTotals(trace)
+
+
+def throughput(trace, totals=None):
+    totals = _totals(trace, totals)
+    cycles = totals.cycles or 1
+    return {
+        'cycles': totals.cycles,
+        'first_cycle': totals.first_cycle,
+        'last_cycle': totals.last_cycle,
+        'served': int(totals.served.sum()),
+        'throughput': round(totals.served.sum() / cycles, 4),
+        'lanes': {lane: round(totals.served[j] / cycles, 4) for j, lane in enumerate(trace.lanes)},
+    }
+
+
+def lane_utilization(trace, totals=None):
+    totals = _totals(trace, totals)
+    cycles = totals.cycles or 1
+    road_index = {road: r for r, road in enumerate(trace.roads)}
+    result = {}
+    for j, lane in enumerate(trace.lanes):
+        green = totals.green_cycles[road_index[lane[0]]]
+        result[lane] = {
+            'mean_queue': round(totals.size_total[j] / cycles, 3),
+            'max_queue': int(totals.size_max[j]),
+            'busy': round(totals.busy[j] / cycles, 4),
+            'green_used': round(totals.served[j] / green, 4) if green else 0.0,
+        }
+    return result
+
+
+def green_efficiency(trace, totals=None):
+    totals = _totals(trace, totals)
+    cycles = totals.cycles or 1
+    result = {}
+    for r, road in enumerate(trace.roads):
+        lanes = [j for j, lane in enumerate(trace.lanes) if lane[0] == road]
+        green = int(totals.green_cycles[r])
+        served = int(totals.served[lanes].sum())
+        capacity = green * len(lanes)
+        result[road] = {
+            'green_cycles': green,
+            'green_share': round(green / cycles, 4),
+            'served': served,
+            'efficiency': round(served / capacity, 4) if capacity else 0.0,
+            'idle_green': int(totals.idle_green[r]),
+        }
+    return result
+
+
+def _bucket_indices(waits, precision_bits):
+    """LatencyHistogram.record's bucket index for each of `waits`, vectorized"""
+    exact_limit = 1 << precision_bits
+    half = exact_limit >> 1
+    index = waits.copy()
+    large = waits >= exact_limit
+    if large.any():
+        values = waits[large]
+        # frexp's exponent is the bit length (exact for waits below 2**53)
+        shift = np.frexp(values.astype(np.float64))[1].astype(np.int64) - precision_bits
+        index[large] = exact_limit + (shift - 1) * half + (values >> shift) - half
+    return index
+
+
+def wait_percentiles(trace, percentiles=PERCENTILES):
+    """Wait in cycles per lane and over all lanes, accumulated in LatencyHistograms"""
+    lanes = len(trace.lanes)
+    histograms = [LatencyHistogram() for _ in range(lanes)]
+    precision_bits = histograms[0].precision_bits
+    queued = np.zeros(lanes, dtype=np.int64)
+    for lane, arrival, serve in trace.chunks("vehicle_lane", "arrival_cycle", "serve_cycle"):
+        lane = np.asarray(lane, dtype=np.int64)
+        done = serve >= 0
+        queued += np.bincount(lane[~done], minlength=lanes)
+        waits = np.maximum(serve[done] - arrival[done], 0)
+        if not len(waits):
+            continue
+        lane = lane[done]
+        index = _bucket_indices(waits, precision_bits)
+        width = int(index.max()) + 1
+        counts = np.bincount(lane * width + index, minlength=lanes * width).reshape(lanes, width)
+        for j in np.flatnonzero(counts.any(axis=1)):
+            lane_waits = waits[lane == j]
+            chunk = LatencyHistogram(precision_bits)
+            chunk.counts = counts[j].tolist()
+            chunk.count = len(lane_waits)
+            chunk.total = int(lane_waits.sum())
+            chunk.min = int(lane_waits.min())
+            chunk.max = int(lane_waits.max())
+            histograms[j].merge(chunk)
+
+    def summary(histogram, still_queued):
+        result = {'count': histogram.count, 'queued': int(still_queued), 'mean': round(histogram.mean(), 3)}
+        for q in percentiles:
+            result[f"p{q}"] = histogram.percentile(q)
+        result['max'] = histogram.max
+        return result
+
+    result = {lane: summary(histograms[j], queued[j]) for j, lane in enumerate(trace.lanes)}
+    combined = LatencyHistogram(precision_bits)
+    for histogram in histograms:
+        combined.merge(histogram)
+    result['all'] = summary(combined, queued.sum())
+    return result
+
+
+def analyze(trace):
+    """Every statistic, sharing one pass over the per-cycle columns"""
+    totals = CycleTotals(trace)
+    return {
+        'throughput': throughput(trace, totals),
+        'lanes': lane_utilization(trace, totals),
+        'green': green_efficiency(trace, totals),
+        'wait': wait_percentiles(trace),
+    }
+
+
+def print_report(trace, report):
+    flow = report['throughput']
+    print(f"{trace.directory}: cycles {flow['first_cycle']}-{flow['last_cycle']} ({flow['cycles']}),"
+          f" {flow['served']} served, {flow['throughput']} vehicles/cycle")
+    print("\n Lane  served/cycle  mean queue  max queue   busy  green used")
+    for lane, lane_stats in report['lanes'].items():
+        print(f"  {lane}  {flow['lanes'][lane]:12.4f} {lane_stats['mean_queue']:11.2f} {lane_stats['max_queue']:10d}"
+              f" {lane_stats['busy']:6.3f} {lane_stats['green_used']:11.3f}")
+    print("\n Road  green cycles  share  served  efficiency  idle green")
+    for road, road_stats in report['green'].items():
+        print(f"  {road}    {road_stats['green_cycles']:12d} {road_stats['green_share']:6.3f} {road_stats['served']:7d}"
+              f" {road_stats['efficiency']:11.3f} {road_stats['idle_green']:11d}")
+    print("\n Wait (cycles)   count   mean   p50   p95   p99   max  queued")
+    for lane, wait in report['wait'].items():
+        print(f"  {lane:>4}: {wait['count']:12d} {wait['mean']:6.1f} {wait['p50']:5d} {wait['p95']:5d}"
+              f" {wait['p99']:5d} {wait['max']:5d} {wait['queued']:7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistics over a columnar trace")
+    parser.add_argument("trace", help="directory written by traffic_generator.py --columns")
+    parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    args = parser.parse_args()
+
+    trace = ColumnarTrace(args.trace)
+    report = analyze(trace)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(trace, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Append-only trace files of broadcast states.
+
+A trace starts with a small header (magic, version and a JSON metadata
+block holding the seed, policy parameters and cycle interval), followed by
+one wire frame per cycle exactly as wire_protocol.encode_frame would put it
+on a socket: a keyframe every `keyframe_interval` cycles and deltas in
+between. Nothing is ever rewritten, so a trace cut short by a crash is still
+readable up to its last complete frame.
+
+TraceReader memory-maps the file, indexes frame offsets and keyframes in
+one pass over the frame headers, and rebuilds the full state of any cycle by
+replaying from the nearest keyframe before it.
+"""
+import bisect
+import json
+import mmap
+import struct
+
+from delta_protocol import DeltaDecoder, DeltaEncoder
+from wire_protocol import (BINARY_CODEC, HEADER_SIZE, MESSAGE_TYPES, ProtocolError, decode_payload, encode_frame,
+                           parse_header)
+
+MAGIC = b"TTRC"
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct("!4sBI")   # magic, trace version, metadata length
+KEYFRAME_INTERVAL = 100
+
+_KEYFRAME = MESSAGE_TYPES.index("keyframe")
+
+
+class TraceError(Exception):
+    pass
+
+
+class TraceWriter:
+    """Encodes each state as a keyframe or delta and appends its frame"""
+    def __init__(self, path, metadata=None, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.metadata['keyframe_interval'] = keyframe_interval
+        self.encoder = DeltaEncoder(keyframe_interval)
+        self.cycles = 0
+        self.file = open(path, "wb")
+        meta = json.dumps(self.metadata).encode("utf-8")
+        self.file.write(TRACE_HEADER.pack(MAGIC, TRACE_VERSION, len(meta)) + meta)
+
+    def write(self, data):
+        message = self.encoder.encode(data)
+        self.file.write(encode_frame(message))
+        self.cycles += 1
+        if message['type'] == 'keyframe':
+            # Keep the file readable up to the last keyframe if the run dies
+            self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def snapshot_of(decoder):
+    """Broadcast-shaped state dict from a DeltaDecoder, safe to keep around"""
+    return {
+        'timestamp': decoder.timestamp,
+        'queues': {lane: {'size': q['size'], 'vehicles': list(q['vehicles'])}
+                   for lane, q in decoder.queues.items()},
+        'current_green_road': decoder.current_green_road,
+        'green_time_remaining': decoder.green_time_remaining,
+    }
+
+
+class TraceReader:
+    """Random access to the states in a trace file through mmap"""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise TraceError(f"{path} is empty")
+        self.view = memoryview(self.map)
+        if len(self.map) < TRACE_HEADER.size or self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise TraceError(f"{path} is not a trace file")
+        _, version, meta_length = TRACE_HEADER.unpack_from(self.map, 0)
+        if version != TRACE_VERSION:
+            self.close()
+            raise TraceError(f"unsupported trace version {version}")
+        start = TRACE_HEADER.size
+        self.metadata = json.loads(bytes(self.view[start:start + meta_length]).decode("utf-8"))
+        self.offsets = []
+        self.keyframes = []
+        self._index(start + meta_length)
+
+    def _index(self, position):
+        end = len(self.map)
+        while position + HEADER_SIZE <= end:
+            try:
+                # A bytes copy of the header, so the traceback holds no view of the map
+                codec, length = parse_header(self.map[position:position + HEADER_SIZE])
+            except ProtocolError as e:
+                self.close()
+                raise TraceError(f"{self.path}: corrupt frame at offset {position}: {e}") from None
+            if position + HEADER_SIZE + length > end:
+                break   # Partial frame from an interrupted recording
+            if self._is_keyframe(codec, position + HEADER_SIZE, length):
+                self.keyframes.append(len(self.offsets))
+            self.offsets.append(position)
+            position += HEADER_SIZE + length
+
+    def _is_keyframe(self, codec, start, length):
+        if codec == BINARY_CODEC:
+            return self.map[start] == _KEYFRAME
+        return decode_payload(codec, self.view[start:start + length]).get('type', 'keyframe') == 'keyframe'
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def message(self, index):
+        """Decoded keyframe or delta for cycle `index` (0-based)"""
+        position = self.offsets[index]
+        codec, length = parse_header(self.view[position:position + HEADER_SIZE])
+        start = position + HEADER_SIZE
+        return decode_payload(codec, self.view[start:start + length])
+
+    def keyframe_before(self, index):
+        """Index of the last keyframe at or before `index`"""
+        position = bisect.bisect_right(self.keyframes, index)
+        if position == 0:
+            raise TraceError("trace does not start with a keyframe")
+        return self.keyframes[position - 1]
+
+    def states(self, start=0, end=None):
+        """Yield (index, state) for every cycle from `start` up to `end`"""
+        end = len(self) if end is None else min(end, len(self))
+        if start >= end:
+            return
+        decoder = DeltaDecoder()
+        for index in range(self.keyframe_before(start), end):
+            if decoder.apply(self.message(index)) is None:
+                raise TraceError(f"trace is missing a frame before cycle {index}")
+            if index >= start:
+                yield index, snapshot_of(decoder)
+
+    def state_at(self, index):
+        for _, state in self.states(index, index + 1):
+            return state
+        raise IndexError(index)
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
@@ -3,47 +3,77 @@ from datetime import datetime
 import time
 
 from queue import VehicleQueue, LanePriorityQueue, LaneNode
+from event_log import DEBUG, EventLog
+from latency_histogram import LatencyHistogram
 from server_socket import SocketServer
+from signal_policies import AL2PriorityPolicy
+from sim_clock import BroadcastThrottle, SimClock
+from subscriptions import HEAD_VEHICLES, Subscription
+from trace_file import TraceWriter
+
+# Lanes with queues, L2 and L3 for each road in road order
+LANES = ["AL2", "AL3", "BL2", "BL3", "CL2", "CL3", "DL2", "DL3"]
+
+# Where a vehicle from each lane may go, picked uniformly
+DESTINATIONS = {
+    "AL3": ("CL1",), "BL3": ("DL1",), "CL3": ("BL1",), "DL3": ("AL1",),
+    # L2 lanes: 50% straight, 50% left
+    "AL2": ("BL1", "DL1"), "BL2": ("AL1", "CL1"), "CL2": ("DL1", "BL1"), "DL2": ("CL1", "AL1"),
+}
+
+
 class Vehicle:
-    """Vehicle with fixed destination based on lane"""
-    def __init__(self, vehicle_id, lane):
-        self.id = vehicle_id
+    """Vehicle with fixed destination based on lane
+
+    The id may be given as the vehicle's number; its "V0042" string is then
+    built the first time it is read, since most vehicles are never shown.
+    """
+    __slots__ = ("_id", "lane", "destination", "enqueue_cycle", "enqueue_ns", "serve_cycle", "serve_ns")
+    
+    def __init__(self, vehicle_id, lane, rng=random, cycle=0, destination=None, enqueue_ns=None):
+        self._id = vehicle_id
         self.lane = lane
-        self.destination = self._get_destination()
-        self.timestamp = datetime.now().isoformat()
+        self.destination = destination if destination is not None else self._get_destination(rng)
+        # Monotonic enqueue/serve stamps: simulation cycle and time.monotonic_ns()
+        self.enqueue_cycle = cycle
+        self.enqueue_ns = enqueue_ns if enqueue_ns is not None else time.monotonic_ns()
+        self.serve_cycle = None
+        self.serve_ns = None
     
-    def _get_destination(self):
-
-       if self.lane == "AL3":
-           return "CL1"
-       elif self.lane == "BL3":
-           return "DL1"
-       elif self.lane == "CL3":
-          return "BL1"
-       elif self.lane == "DL3":
-          return "AL1"
+    @property
+    def id(self):
+        vehicle_id = self._id
+        if vehicle_id.__class__ is int:
+            vehicle_id = self._id = f"V{vehicle_id:04d}"
+        return vehicle_id
     
-    # L2 lanes: 50% straight, 50% left
-       elif self.lane == "AL2":
-           return random.choice(["BL1", "DL1"])
-       elif self.lane == "BL2":
-           return random.choice(["AL1", "CL1"])
-       elif self.lane == "CL2":
-           return random.choice(["DL1", "BL1"])
-       elif self.lane == "DL2":
-           return random.choice(["CL1", "AL1"])
-    
-       return None
-  
+    def _get_destination(self, rng=random):
+        choices = DESTINATIONS.get(self.lane)
+        if not choices:
+            return None
+        if len(choices) == 1:
+            return choices[0]
+        return rng.choice(choices)
     
     def __repr__(self):
         return f"{self.id}({self.lane}→{self.destination})"
 
 
 class TrafficSystem:
-    def __init__(self):
+    def __init__(self, seed=None, headless=False, server_mode="threaded",
+                 priority_arrival_rate=0.7, arrival_rate=0.3, priority_high=10, priority_low=5,
+                 priority_green_offset=4, green_time_scale=1.0, policy=None, events=None,
+                 record=None, arrivals=None):
         # Only L2 and L3 lanes (no L1 - incoming only)
-        self.lanes = ["AL2", "AL3", "BL2", "BL3", "CL2", "CL3", "DL2", "DL3"]
+        self.lanes = list(LANES)
+        self.road_lanes = {road: [lane for lane in self.lanes if lane.startswith(road)]
+                           for road in "ABCD"}
+        # Lanes that receive new vehicles from vehicle_adder (a road network
+        # restricts this to roads entering from outside the grid)
+        self.arrival_lanes = list(self.lanes)
+        # Optional arrivals.ArrivalGenerator drawing arrivals in blocks of
+        # cycles (rate schedules, Poisson); None uses the per-lane draws below
+        self.arrivals = arrivals
         
         self.queues = {lane: VehicleQueue(lane) for lane in self.lanes}
         self.current_green_road = None
@@ -51,8 +81,51 @@ class TrafficSystem:
         self.lane_priority_queue = LanePriorityQueue()
         self._initialize_lane_priority_queue()
         self.vehicle_counter = 0
-        self.socket_server = SocketServer()
-        self.socket_server.start()
+        self.cycle = 0
+        self.green_phase_counts = {road: 0 for road in "ABCD"}
+        # Per-lane wait of served vehicles, in cycles and in nanoseconds
+        self.wait_cycles = {lane: LatencyHistogram() for lane in self.lanes}
+        self.wait_ns = {lane: LatencyHistogram() for lane in self.lanes}
+        
+        # Traffic policy: arrival probability per cycle (AL2 / other lanes),
+        # AL2 priority on above `priority_high` and off below `priority_low`,
+        # and green time of `size - priority_green_offset` for a priority AL2
+        # or `green_time_scale` x the average normal lane otherwise.
+        self.priority_arrival_rate = priority_arrival_rate
+        self.arrival_rate = arrival_rate
+        self.priority_high = priority_high
+        self.priority_low = priority_low
+        self.priority_green_offset = priority_green_offset
+        self.green_time_scale = green_time_scale
+        # Decides which road gets green and for how long (signal_policies.py)
+        self.policy = policy if policy is not None else AL2PriorityPolicy()
+        
+        # A seeded RNG makes a run reproducible; headless mode skips the
+        # socket server and all console output so it can run flat out.
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.headless = headless
+        # run() appends every broadcast state to this trace file (trace_file.py)
+        self.record = record
+        # Structured events (event_log.py); interactive runs show them all on
+        # the console, headless runs log nothing unless given an EventLog
+        if events is None:
+            events = EventLog() if headless else EventLog(level=DEBUG, console=True)
+        self.events = events
+        # Optional metrics.Metrics, filled in by step() and run()
+        self.metrics = None
+        # Optional shm_transport.SharedStateWriter, published to like the socket server
+        self.shared_state = None
+        # Optional columnar_trace.ColumnarTraceWriter, given every cycle by step()
+        self.columns = None
+        self.socket_server = None
+        if not headless:
+            if server_mode == "asyncio":
+                from async_server_socket import AsyncSocketServer
+                self.socket_server = AsyncSocketServer()
+            else:
+                self.socket_server = SocketServer()
+            self.socket_server.start()
     
     def _initialize_lane_priority_queue(self):
         """Only L2 lanes in priority queue"""
@@ -61,122 +134,359 @@ class TrafficSystem:
     
     def vehicle_adder(self):
         """Add vehicles to lanes"""
-        for lane in self.lanes:
-            probability = 0.7 if lane == "AL2" else 0.3
-            if random.random() < probability:
+        if self.arrivals is not None:
+            self._add_generated_vehicles()
+            return
+        rng = self.rng
+        events = self.events
+        for lane in self.arrival_lanes:
+            probability = self.priority_arrival_rate if lane == "AL2" else self.arrival_rate
+            if rng.random() < probability:
                 self.vehicle_counter += 1
-                vehicle = Vehicle(f"V{self.vehicle_counter:04d}", lane)
+                vehicle = Vehicle(self.vehicle_counter, lane, rng, self.cycle)
                 self.queues[lane].enqueue(vehicle)
-                print(f"Added {vehicle.id} to {lane} [Size: {self.queues[lane].size()}]")
+                if events.debug:
+                    events.emit("vehicle_added", self.cycle, vehicle=vehicle.id, lane=lane,
+                                size=self.queues[lane].size())
+        self.check_priority_condition()
+    
+    def _add_generated_vehicles(self):
+        """Enqueue this cycle's arrivals from the block generator with their drawn destinations.
+
+        One timestamp serves the whole cycle and ids are numbers, formatted
+        only if something reads them, so an arrival costs little more than
+        creating and enqueueing its Vehicle.
+        """
+        queues = self.queues
+        events = self.events
+        cycle = self.cycle
+        now_ns = time.monotonic_ns()
+        counter = self.vehicle_counter
+        arrivals = self.arrivals.arrivals(cycle)
+        if events.debug:
+            for lane, destination in arrivals:
+                counter += 1
+                vehicle = Vehicle(counter, lane, None, cycle, destination, now_ns)
+                queues[lane].enqueue(vehicle)
+                events.emit("vehicle_added", cycle, vehicle=vehicle.id, lane=lane, size=queues[lane].size())
+        else:
+            for lane, destination in arrivals:
+                counter += 1
+                queues[lane].enqueue(Vehicle(counter, lane, None, cycle, destination, now_ns))
+        self.vehicle_counter = counter
         self.check_priority_condition()
     
     def check_priority_condition(self):
-        """Check AL2 priority"""
-        al2_size = self.queues["AL2"].size()
-        if al2_size > 10:
-            self.lane_priority_queue.update_priority("AL2", 10)
-            print(f"  AL2 PRIORITY (Size: {al2_size})")
-        elif al2_size < 5:
-            self.lane_priority_queue.update_priority("AL2", 0)
+        """Check AL2 priority (or whatever the signal policy watches)"""
+        self.policy.check_priority_condition(self)
+    
+    def step(self):
+        """One cycle: new arrivals, then the lights; returns the vehicles served"""
+        self.cycle += 1
+        metrics = self.metrics
+        if metrics is not None and self.cycle % metrics.sample_every == 0:
+            start = time.perf_counter_ns()
+            self.vehicle_adder()
+            middle = time.perf_counter_ns()
+            served = self.process_traffic_lights()
+            metrics.phase_ns["arrivals"].record(middle - start)
+            metrics.phase_ns["lights"].record(time.perf_counter_ns() - middle)
+        else:
+            self.vehicle_adder()
+            served = self.process_traffic_lights()
+        if self.columns is not None:
+            self.columns.record(self, served)
+        if self.events.info:
+            self.events.emit("cycle_summary", self.cycle, green=self.current_green_road,
+                             lanes={lane: self.queues[lane].size() for lane in self.lanes},
+                             priority={node.lane_name: node.priority
+                                       for node in self.lane_priority_queue.get_all_lanes()})
+        return served
     
     def process_traffic_lights(self):
-        """Process traffic lights"""
+        """Process traffic lights; returns the vehicles served this cycle"""
         if self.current_green_road is None or self.green_time_remaining <= 0:
             self.select_next_green_road()
         
         if self.green_time_remaining > 0:
             self.green_time_remaining -= 1
-            self.serve_current_green_road()
+            return self.serve_current_green_road()
+        return []
     
     def select_next_green_road(self):
         """Select next green road"""
-        lanes_to_serve = self.lane_priority_queue.get_all_lanes()
-        if not lanes_to_serve:
+        choice = self.policy.select_next_green_road(self)
+        if choice is None:
             return
         
-        next_lane = lanes_to_serve[0]
-        for lane_node in lanes_to_serve:
-            if not self.queues[lane_node.lane_name].is_empty():
-                next_lane = lane_node
-                break
-        
-        self.current_green_road = next_lane.lane_name[0]
-        
-        if next_lane.lane_name == "AL2" and next_lane.priority > 0:
-            vehicles_to_serve = max(0, self.queues[next_lane.lane_name].size() - 4)
-            self.green_time_remaining = vehicles_to_serve
-        else:
-            normal_lanes = [ln for ln in lanes_to_serve if ln.priority == 0]
-            if normal_lanes:
-                total_vehicles = sum(self.queues[ln.lane_name].size() for ln in normal_lanes)
-                avg_vehicles = total_vehicles / len(normal_lanes) if normal_lanes else 0
-                self.green_time_remaining = int(avg_vehicles)
+        self.current_green_road, self.green_time_remaining = choice
+        self.green_phase_counts[self.current_green_road] += 1
         
-        print(f" Road {self.current_green_road} GREEN (for {self.green_time_remaining} vehicles)")
+        if self.events.info:
+            self.events.emit("light_change", self.cycle, road=self.current_green_road,
+                             green_time=self.green_time_remaining)
     
     def serve_current_green_road(self):
         """Serve vehicles from current green road"""
         if not self.current_green_road:
-            return
+            return []
         
-        road_lanes = [lane for lane in self.lanes if lane.startswith(self.current_green_road)]
-        for lane in road_lanes:
+        served = []
+        events = self.events
+        now_ns = time.monotonic_ns()
+        for lane in self.road_lanes[self.current_green_road]:
             if not self.queues[lane].is_empty():
                 vehicle = self.queues[lane].dequeue()
-                print(f"  ✓ {vehicle.id} passed from {lane}")
+                vehicle.serve_cycle = self.cycle
+                vehicle.serve_ns = now_ns
+                self.wait_cycles[lane].record(self.cycle - vehicle.enqueue_cycle)
+                self.wait_ns[lane].record(now_ns - vehicle.enqueue_ns)
+                served.append(vehicle)
+                if events.debug:
+                    events.emit("vehicle_served", self.cycle, vehicle=vehicle.id, lane=lane)
         
         self.check_priority_condition()
+        return served
+    
+    def snapshot(self, head=HEAD_VEHICLES):
+        """State broadcast to clients: lane sizes, the first `head` vehicles per lane and the lights"""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'queues': {
+                lane: {
+                    'size': self.queues[lane].size(),
+                    'vehicles': [{'id': v.id, 'lane': v.lane, 'destination': v.destination} 
+                               for v in self.queues[lane].peek(head)]
+                }
+                for lane in self.lanes
+            },
+            'current_green_road': self.current_green_road,
+            'green_time_remaining': self.green_time_remaining
+        }
     
-    def run(self, interval=1.5, cycles=100):
-        """Run simulation"""
-        cycle_count = 0
+    def trace_metadata(self, interval):
+        return {
+            'seed': self.seed,
+            'interval': interval,
+            'policy': repr(self.policy),
+            'params': {name: getattr(self, name) for name in (
+                'priority_arrival_rate', 'arrival_rate', 'priority_high', 'priority_low',
+                'priority_green_offset', 'green_time_scale')},
+            'arrivals': repr(self.arrivals) if self.arrivals is not None else 'per-lane',
+            'created': datetime.now().isoformat(),
+        }
+    
+    def run(self, interval=1.5, cycles=100, speed=1.0, max_rate=None, clock=None, checkpointer=None):
+        """Run simulation at `speed` x real time (0 = free-running), broadcasting at most `max_rate` states/s
+
+        A checkpoint.Checkpointer, if given, saves the system every N cycles and once at the end.
+        """
+        if clock is None:
+            clock = SimClock(interval, speed)
+        throttle = BroadcastThrottle(max_rate)
+        recorder = TraceWriter(self.record, self.trace_metadata(clock.interval)) if self.record else None
+        server = self.socket_server
+        shared_state = self.shared_state
+        trace_view = Subscription()     # All lanes, HEAD_VEHICLES per lane
+        
+        def publish(data):
+            if server:
+                server.broadcast_data(data)
+            if shared_state:
+                shared_state.publish(data)
+        
+        def head():
+            # Subscribers may want more head vehicles than the trace keeps
+            return max(HEAD_VEHICLES, server.subscriptions.head) if server else HEAD_VEHICLES
+        
+        def broadcast_latest():
+            if (server or shared_state) and throttle.stale:
+                publish(self.snapshot(head()))
+                throttle.force()
         
         try:
-            while True:
-                if cycles is not None and cycle_count >= cycles:
+            while clock.running:
+                if cycles is not None and clock.cycles >= cycles:
                     break
                 
-                cycle_count += 1
-                print(f"\n{'='*60}\nCYCLE {cycle_count}\n{'='*60}")
-                
-                print("\n Generating vehicles...")
-                self.vehicle_adder()
+                # Arrivals, lights and the queue status are reported through
+                # self.events, written by its background thread
+                self.step()
                 
-                print(f"\n Processing traffic lights...")
-                self.process_traffic_lights()
+                # Broadcast to clients when one is due; the trace gets every cycle
+                send = (server is not None or shared_state is not None) and throttle.due()
+                if send or recorder:
+                    start = time.perf_counter_ns()
+                    data = self.snapshot(head() if send else HEAD_VEHICLES)
+                    if recorder:
+                        recorder.write(trace_view.filter(data))
+                    if send:
+                        publish(data)
+                        if self.metrics is not None:
+                            self.metrics.phase_ns["broadcast"].record(time.perf_counter_ns() - start)
                 
-                print(f"\n Queue Status:")
-                for lane in self.lanes:
-                    size = self.queues[lane].size()
-                    priority = self.lane_priority_queue.get_priority(lane) or 0
-                    status = "  GREEN" if lane[0] == self.current_green_road else "  RED"
-                    if priority > 0:
-                        status += "  PRIORITY"
-                    print(f"  {lane}: {size:2d} vehicles{status}")
-                
-                # Broadcast to client
-                data = {
-                    'timestamp': datetime.now().isoformat(),
-                    'queues': {
-                        lane: {
-                            'size': self.queues[lane].size(),
-                            'vehicles': [{'id': v.id, 'lane': v.lane, 'destination': v.destination} 
-                                       for v in self.queues[lane].get_all_vehicles()[:12]]  # Max 12
-                        }
-                        for lane in self.lanes
-                    },
-                    'current_green_road': self.current_green_road,
-                    'green_time_remaining': self.green_time_remaining
-                }
-                self.socket_server.broadcast_data(data)
-                
-                time.sleep(interval)
+                if checkpointer:
+                    checkpointer.maybe_save(self)
+                clock.tick(on_pause=broadcast_latest)
+            # Clients end up on the final state even if it was throttled
+            broadcast_latest()
                 
         except KeyboardInterrupt:
+            self.events.flush()
             print("\n\n Traffic system stopped")
-            self.socket_server.stop()
+            if self.socket_server:
+                self.socket_server.stop()
+        finally:
+            if recorder:
+                recorder.close()
+            if checkpointer:
+                if checkpointer.last_cycle != self.cycle:
+                    checkpointer.save(self, wait=True)
+                checkpointer.close()
+        
+        self.events.flush()
+        print(f"\n Simulation Complete\nTotal cycles: {clock.cycles}\nTotal vehicles: {self.vehicle_counter}")
+        print(f" Simulated {clock.sim_time:.1f}s in {clock.wall_time:.1f}s")
+        if server or shared_state:
+            print(f" Broadcast {throttle.sent} states ({throttle.skipped} throttled)")
+        if recorder:
+            print(f" Recorded {recorder.cycles} cycles to {self.record}")
+        if checkpointer and checkpointer.saved:
+            print(f" Checkpointed cycle {checkpointer.last_cycle} to {checkpointer.path}"
+                  f" ({checkpointer.saved} saves, {checkpointer.skipped} skipped)")
+        print("\n Wait (cycles)   p50  p95  p99  max")
+        for lane in self.lanes:
+            w = self.wait_cycles[lane]
+            print(f"  {lane}: {w.percentile(50):11d} {w.percentile(95):4d} {w.percentile(99):4d} {w.max:4d}")
+    
+    def run_headless(self, cycles):
+        """Run cycles as fast as possible and return aggregate statistics"""
+        lanes = self.lanes
+        queues = [self.queues[lane] for lane in lanes]
+        size_totals = [0] * len(lanes)
+        size_max = [0] * len(lanes)
+        served_before = [q.total_vehicles_processed for q in queues]
+        phases_before = dict(self.green_phase_counts)
+        generated_before = self.vehicle_counter
+        
+        for _ in range(cycles):
+            self.step()
+            # Sampled at the same point as the queue status block in run()
+            for i, q in enumerate(queues):
+                size = q.size()
+                size_totals[i] += size
+                if size > size_max[i]:
+                    size_max[i] = size
         
-        print(f"\n Simulation Complete\nTotal cycles: {cycle_count}\nTotal vehicles: {self.vehicle_counter}")
+        served = [q.total_vehicles_processed - before for q, before in zip(queues, served_before)]
+        total_served = sum(served)
+        return {
+            'cycles': cycles,
+            'vehicles_generated': self.vehicle_counter - generated_before,
+            'vehicles_served': total_served,
+            'throughput': total_served / cycles if cycles else 0.0,
+            'lanes': {
+                lane: {
+                    'served': served[i],
+                    'max_queue': size_max[i],
+                    'mean_queue': size_totals[i] / cycles if cycles else 0.0,
+                    'final_queue': queues[i].size(),
+                    'wait': self.wait_cycles[lane].summary(),
+                }
+                for i, lane in enumerate(lanes)
+            },
+            'green_phases': {road: count - phases_before[road]
+                             for road, count in self.green_phase_counts.items()},
+        }
+
+
 if __name__ == "__main__":
-    traffic_system = TrafficSystem()
-    traffic_system.run(interval=0.5, cycles=100)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Traffic generator server")
+    parser.add_argument("--server", choices=["threaded", "asyncio"], default="threaded",
+                        help="socket server implementation (asyncio isolates slow clients)")
+    parser.add_argument("--interval", type=float, default=0.5, help="simulated seconds per cycle")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="times real time (e.g. 60 = an hour a minute; 0 = as fast as possible)")
+    parser.add_argument("--max-rate", type=float, default=30.0,
+                        help="most states broadcast per second; the latest state is always sent (0 = every cycle)")
+    parser.add_argument("--controls", action="store_true", help="read speed/pause/resume commands from stdin")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--checkpoint", metavar="FILE", help="save the full system state to this file")
+    parser.add_argument("--checkpoint-every", type=int, default=10000,
+                        help="cycles between checkpoints (also saved at the end; 0 = only at the end)")
+    parser.add_argument("--restore", metavar="FILE", help="resume from a checkpoint")
+    parser.add_argument("--cycles", type=int, default=100, help="cycles to run (0 = forever)")
+    parser.add_argument("--log-file", help="also write events to this file as JSON lines")
+    parser.add_argument("--log-level", choices=["debug", "info"], default="debug",
+                        help="debug includes every vehicle added and served")
+    parser.add_argument("--log-sample", type=float, default=1.0,
+                        help="fraction of per-vehicle events to keep")
+    parser.add_argument("--quiet", action="store_true", help="no events on the console")
+    parser.add_argument("--seed", type=int, help="seed the arrivals so the run can be reproduced")
+    parser.add_argument("--record", metavar="TRACE", help="write every broadcast state to this trace file")
+    parser.add_argument("--headless", action="store_true", help="no socket server (e.g. to record quickly)")
+    parser.add_argument("--columns", metavar="DIR",
+                        help="write per-cycle and per-vehicle columns as .npy chunks for trace_analysis.py (needs NumPy)")
+    parser.add_argument("--chunk-rows", type=int, default=65536, help="rows per --columns chunk file")
+    parser.add_argument("--columns-overwrite", action="store_true",
+                        help="replace the columnar trace already in --columns DIR")
+    parser.add_argument("--shm", metavar="NAME",
+                        help="also publish states to this shared memory block for same-host simulators")
+    parser.add_argument("--shm-force", action="store_true",
+                        help="replace the --shm block even if another writer is still using it")
+    parser.add_argument("--arrivals", choices=["per-lane", "bernoulli", "poisson"], default="per-lane",
+                        help="bernoulli/poisson draw arrivals in vectorized blocks (needs NumPy)")
+    parser.add_argument("--schedule", help="CSV of arrival rates per lane over cycles (implies --arrivals bernoulli)")
+    parser.add_argument("--schedule-period", type=int, help="repeat the schedule every N cycles")
+    args = parser.parse_args()
+    
+    events = EventLog(path=args.log_file, level=args.log_level, console=not args.quiet,
+                      sample=args.log_sample)
+    traffic_system = TrafficSystem(seed=args.seed, headless=args.headless, server_mode=args.server,
+                                   events=events, record=args.record)
+    if args.schedule or args.arrivals != "per-lane":
+        from arrivals import ArrivalGenerator, RateSchedule
+        schedule = RateSchedule.load(args.schedule, period=args.schedule_period) if args.schedule else None
+        model = "bernoulli" if args.arrivals == "per-lane" else args.arrivals
+        traffic_system.arrivals = ArrivalGenerator.for_system(traffic_system, schedule=schedule, model=model)
+    if args.restore:
+        import checkpoint
+        checkpoint.restore(traffic_system, checkpoint.load(args.restore))
+        print(f"[CHECKPOINT] Restored cycle {traffic_system.cycle} from {args.restore}")
+    checkpointer = None
+    if args.checkpoint:
+        from checkpoint import Checkpointer
+        checkpointer = Checkpointer(args.checkpoint, args.checkpoint_every)
+    endpoint = None
+    if args.metrics_port is not None:
+        from metrics import Metrics, MetricsEndpoint
+        traffic_system.metrics = Metrics(traffic_system)
+        endpoint = MetricsEndpoint(traffic_system.metrics, args.metrics_port)
+        endpoint.start()
+    if args.columns:
+        from columnar_trace import ColumnarTraceWriter
+        traffic_system.columns = ColumnarTraceWriter(args.columns, traffic_system.lanes, args.chunk_rows,
+                                                     traffic_system.trace_metadata(args.interval),
+                                                     overwrite=args.columns_overwrite)
+    if args.shm:
+        from shm_transport import SharedStateWriter
+        traffic_system.shared_state = SharedStateWriter(args.shm, traffic_system.lanes, force=args.shm_force)
+        print(f"[SHM] Publishing to shared memory {args.shm!r}")
+    clock = SimClock(args.interval, args.speed)
+    if args.controls:
+        import threading
+        from sim_clock import read_controls
+        threading.Thread(target=read_controls, args=(clock,), daemon=True).start()
+    traffic_system.run(cycles=args.cycles or None, max_rate=args.max_rate or None, clock=clock,
+                       checkpointer=checkpointer)
+    events.close()
+    if endpoint:
+        endpoint.stop()
+    if traffic_system.shared_state:
+        traffic_system.shared_state.close()
+    if traffic_system.columns:
+        traffic_system.columns.close(traffic_system)
+        print(f" Wrote {traffic_system.columns.cycles} cycles and {traffic_system.columns.vehicles} vehicles"
+              f" to {args.columns}")
@@ -0,0 +1,239 @@
+import json
+import math
+import struct
+from datetime import datetime
+
+# Every message is one frame: version, codec and payload length, then payload.
+VERSION = 1
+JSON_CODEC = 0
+BINARY_CODEC = 1
+FRAME_HEADER = struct.Struct("!BBI")
+HEADER_SIZE = FRAME_HEADER.size
+# Largest payload a reader accepts, so a corrupt or hostile header cannot
+# make it allocate gigabytes (a full keyframe is a few kB)
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Binary codec: fixed codes for message types, lanes and roads
+MESSAGE_TYPES = ["keyframe", "delta", "resync"]
+LANE_CODES = ["AL1", "AL2", "AL3", "BL1", "BL2", "BL3",
+              "CL1", "CL2", "CL3", "DL1", "DL2", "DL3"]
+ROAD_CODES = "ABCD"
+NONE_CODE = 255
+
+_TYPE_INDEX = {name: i for i, name in enumerate(MESSAGE_TYPES)}
+_SCHEMA_KEYS = {
+    'keyframe': {'type', 'seq', 'timestamp', 'queues', 'current_green_road', 'green_time_remaining'},
+    'delta': {'type', 'seq', 'timestamp', 'lanes', 'current_green_road', 'green_time_remaining'},
+    'resync': {'type'},
+}
+_LANE_INDEX = {name: i for i, name in enumerate(LANE_CODES)}
+_DEST_INDEX = {**_LANE_INDEX, None: NONE_CODE}
+_DEST_CODES = LANE_CODES + [None] * (256 - len(LANE_CODES))
+_ROAD_INDEX = {name: i for i, name in enumerate(ROAD_CODES)}
+
+HAS_GREEN_ROAD = 1
+HAS_GREEN_TIME = 2
+
+_MESSAGE = struct.Struct("!BIdBBiB")   # type, seq, timestamp, flags, road, green time, lane count
+_LANE = struct.Struct("!BIHH")         # lane, size, dequeued count, enqueued count
+_VEHICLE_FORMAT = "IBB"               # id, lane, destination
+_structs = {}
+_id_numbers = {}
+_id_strings = {}
+
+
+def _struct(format, count):
+    """Cached Struct for `count` big-endian repetitions of `format`"""
+    key = (format, count)
+    packer = _structs.get(key)
+    if packer is None:
+        packer = _structs[key] = struct.Struct("!" + format * count)
+    return packer
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def _vehicle_number(vehicle_id):
+    """'V0042' -> 42; raises ValueError if the id would not round-trip"""
+    number = _id_numbers.get(vehicle_id)
+    if number is not None:
+        return number
+    if not isinstance(vehicle_id, str) or vehicle_id[:1] != "V":
+        raise ValueError(vehicle_id)
+    number = int(vehicle_id[1:])
+    if number < 0 or number > 0xFFFFFFFF or f"V{number:04d}" != vehicle_id:
+        raise ValueError(vehicle_id)
+    if len(_id_numbers) > 65536:
+        _id_numbers.clear()
+    _id_numbers[vehicle_id] = number
+    return number
+
+
+def _vehicle_id(number):
+    vehicle_id = _id_strings.get(number)
+    if vehicle_id is None:
+        if len(_id_strings) > 65536:
+            _id_strings.clear()
+        vehicle_id = _id_strings[number] = f"V{number:04d}"
+    return vehicle_id
+
+
+def _pack_vehicles(out, vehicles):
+    fields = []
+    for vehicle in vehicles:
+        if len(vehicle) != 3:
+            raise ValueError(vehicle)
+        fields += (_vehicle_number(vehicle['id']), _LANE_INDEX[vehicle['lane']],
+                   _DEST_INDEX[vehicle['destination']])
+    out += _struct(_VEHICLE_FORMAT, len(vehicles)).pack(*fields)
+
+
+def encode_binary(message):
+    """Pack a keyframe/delta/resync message; raises ValueError if it doesn't fit the schema"""
+    kind = message.get('type')
+    if kind not in _TYPE_INDEX or not message.keys() <= _SCHEMA_KEYS[kind]:
+        raise ValueError(kind)
+    if kind == 'resync':
+        return bytearray(_MESSAGE.pack(_TYPE_INDEX[kind], 0, math.nan, 0, NONE_CODE, 0, 0))
+
+    flags = 0
+    road = NONE_CODE
+    green_time = 0
+    if kind == 'keyframe' or 'current_green_road' in message:
+        flags |= HAS_GREEN_ROAD
+        green_road = message.get('current_green_road')
+        road = NONE_CODE if green_road is None else _ROAD_INDEX[green_road]
+    if kind == 'keyframe' or 'green_time_remaining' in message:
+        flags |= HAS_GREEN_TIME
+        green_time = message.get('green_time_remaining', 0)
+
+    timestamp = message.get('timestamp')
+    timestamp = datetime.fromisoformat(timestamp).timestamp() if timestamp else math.nan
+
+    lanes = message.get('queues') if kind == 'keyframe' else message.get('lanes')
+    lanes = lanes or {}
+    out = bytearray(_MESSAGE.pack(_TYPE_INDEX[kind], message.get('seq') or 0, timestamp,
+                                  flags, road, green_time, len(lanes)))
+    for lane, data in lanes.items():
+        if kind == 'keyframe':
+            dequeued, enqueued = (), data.get('vehicles', ())
+        else:
+            dequeued, enqueued = data.get('dequeued', ()), data.get('enqueued', ())
+        out += _LANE.pack(_LANE_INDEX[lane], data['size'], len(dequeued), len(enqueued))
+        if dequeued:
+            out += _struct("I", len(dequeued)).pack(*[_vehicle_number(v) for v in dequeued])
+        if enqueued:
+            _pack_vehicles(out, enqueued)
+    return out
+
+
+def decode_binary(buffer):
+    """Inverse of encode_binary; accepts any bytes-like object (e.g. a memoryview)"""
+    kind, seq, timestamp, flags, road, green_time, lane_count = _MESSAGE.unpack_from(buffer, 0)
+    kind = MESSAGE_TYPES[kind]
+    offset = _MESSAGE.size
+    if kind == 'resync':
+        return {'type': kind}
+    message = {'type': kind, 'seq': seq}
+    message['timestamp'] = None if math.isnan(timestamp) else datetime.fromtimestamp(timestamp).isoformat()
+
+    lanes = {}
+    for _ in range(lane_count):
+        lane, size, n_dequeued, n_enqueued = _LANE.unpack_from(buffer, offset)
+        offset += _LANE.size
+        dequeued = []
+        if n_dequeued:
+            ids = _struct("I", n_dequeued)
+            dequeued = [_vehicle_id(number) for number in ids.unpack_from(buffer, offset)]
+            offset += ids.size
+        enqueued = []
+        if n_enqueued:
+            records = _struct(_VEHICLE_FORMAT, n_enqueued)
+            fields = records.unpack_from(buffer, offset)
+            offset += records.size
+            enqueued = [{'id': _vehicle_id(number), 'lane': LANE_CODES[lane], 'destination': _DEST_CODES[dest]}
+                        for number, lane, dest in zip(fields[0::3], fields[1::3], fields[2::3])]
+        if kind == 'keyframe':
+            lanes[LANE_CODES[lane]] = {'size': size, 'vehicles': enqueued}
+        else:
+            change = {'size': size}
+            if dequeued:
+                change['dequeued'] = dequeued
+            if enqueued:
+                change['enqueued'] = enqueued
+            lanes[LANE_CODES[lane]] = change
+
+    if kind == 'keyframe':
+        message['queues'] = lanes
+    elif lanes:
+        message['lanes'] = lanes
+    if flags & HAS_GREEN_ROAD:
+        message['current_green_road'] = None if road == NONE_CODE else ROAD_CODES[road]
+    if flags & HAS_GREEN_TIME:
+        message['green_time_remaining'] = green_time
+    return message
+
+
+def encode_frame(message):
+    """Frame a message, using the binary codec when the message fits its schema"""
+    try:
+        payload = encode_binary(message)
+        codec = BINARY_CODEC
+    except (ValueError, KeyError, TypeError, struct.error):
+        payload = json.dumps(message).encode("utf-8")
+        codec = JSON_CODEC
+    return FRAME_HEADER.pack(VERSION, codec, len(payload)) + payload
+
+
+def parse_header(header, max_size=MAX_FRAME_SIZE):
+    version, codec, length = FRAME_HEADER.unpack_from(header, 0)
+    if version != VERSION:
+        raise ProtocolError(f"unsupported protocol version {version}")
+    if length > max_size:
+        raise ProtocolError(f"frame of {length} bytes exceeds the {max_size} byte limit")
+    return codec, length
+
+
+def decode_payload(codec, payload):
+    if codec == BINARY_CODEC:
+        return decode_binary(payload)
+    if codec == JSON_CODEC:
+        return json.loads(bytes(payload).decode("utf-8"))
+    raise ProtocolError(f"unknown codec {codec}")
+
+
+class FrameReader:
+    """Reads whole frames from a socket into one reusable buffer.
+
+    recv_into fills a preallocated bytearray through a memoryview, looping
+    until the frame is complete, so large frames survive partial reads and
+    no intermediate bytes objects are built.
+    """
+    def __init__(self, sock, size=64 * 1024, max_size=MAX_FRAME_SIZE):
+        self.sock = sock
+        self.max_size = max_size
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def _fill(self, n):
+        if n > len(self.buffer):
+            self.buffer = bytearray(max(n, 2 * len(self.buffer)))
+            self.view = memoryview(self.buffer)
+        received = 0
+        while received < n:
+            count = self.sock.recv_into(self.view[received:n], n - received)
+            if count == 0:
+                return False
+            received += count
+        return True
+
+    def read_message(self):
+        """Return the next decoded message, or None when the peer closed"""
+        if not self._fill(HEADER_SIZE):
+            return None
+        codec, length = parse_header(self.view, self.max_size)
+        if not self._fill(length):
+            return None
+        return decode_payload(codec, self.view[:length])